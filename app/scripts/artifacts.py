@@ -0,0 +1,137 @@
+from collections import deque
+from capture import save_frame
+import threading
+import atexit
+import time
+import cv2
+import os
+
+FORMATS = {
+    # name: (extension, imwrite params)
+    'png':  ('.png', [cv2.IMWRITE_PNG_COMPRESSION, 6]),
+    'fast': ('.png', [cv2.IMWRITE_PNG_COMPRESSION, 1]),
+    'bmp':  ('.bmp', []),
+    'jpg':  ('.jpg', [cv2.IMWRITE_JPEG_QUALITY, 90]),
+}
+
+class ArtifactWriter:
+    """
+    Writes debug images on a background thread.
+
+    The queue is bounded; when it is full the oldest pending artifact is dropped.
+    After writing, the directory is pruned to the newest max_files files and,
+    if set, max_bytes total (checked at most once per prune_interval seconds).
+    """
+    def __init__(self,
+                 directory: str = '../logs',
+                 fmt: str = 'fast',
+                 max_queue: int = 16,
+                 max_files: int = 500,
+                 max_bytes: int = None,
+                 timestamped: bool = False,
+                 prune_interval: float = 5.0
+                 ) -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown artifact format {fmt}; choose from {list(FORMATS)}.")
+        self.directory: str = directory
+        self.fmt: str = fmt
+        self.max_files: int = max_files
+        self.max_bytes: int = max_bytes
+        self.timestamped: bool = timestamped
+        self.prune_interval: float = prune_interval
+        self.written: int = 0
+        self.dropped: int = 0
+        self._queue: deque = deque(maxlen=max_queue)
+        self._cond = threading.Condition()
+        self._busy: bool = False
+        self._thread = None
+        self._closed: bool = False
+        self._last_prune: float = 0.0
+
+    def _start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='artifact-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def path_for(self, name: str) -> str:
+        stem, _ = os.path.splitext(name)
+        if self.timestamped:
+            stem = f"{stem}_{time.strftime('%Y%m%d-%H%M%S')}_{int(time.time() * 1000) % 1000:03d}"
+        extension, _ = FORMATS[self.fmt]
+        return os.path.join(self.directory, stem + extension)
+
+    def submit(self, name: str, frame) -> str:
+        """Queues frame (a BGR array) to be written as name under directory; returns the final path."""
+        if self._closed or frame is None or frame.size == 0:
+            return None
+        path = self.path_for(os.path.basename(name))
+        with self._cond:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append((path, frame))
+            self._start()
+            self._cond.notify()
+        return path
+
+    def _run(self) -> None:
+        _, params = FORMATS[self.fmt]
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                path, frame = self._queue.popleft()
+                self._busy = True
+            try:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                save_frame(path, frame, params)
+                self.written += 1
+                if time.time() - self._last_prune >= self.prune_interval:
+                    self.prune()
+            except Exception as e:
+                print(f"Error writing artifact {path}: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def prune(self) -> int:
+        # Retention: newest files win
+        self._last_prune = time.time()
+        if not os.path.isdir(self.directory):
+            return 0
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.is_file()),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True
+        )
+        removed = 0
+        total = 0
+        for i, entry in enumerate(entries):
+            total += entry.stat().st_size
+            if i >= self.max_files or (self.max_bytes is not None and total > self.max_bytes):
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def flush(self, timeout: float = None) -> bool:
+        """Blocks until every queued artifact is written."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
@@ -0,0 +1,261 @@
+"""
+Offline benchmark over a recorded screenshot corpus.
+
+A corpus is a directory of frames plus a labels.json mapping each frame name to
+its ground-truth boxes per template, and optionally OCR regions:
+
+    {
+        "frame_000.png": {
+            "boxes": {"../images/EasyApply.png": [[x1, y1, x2, y2], ...]},
+            "ocr": [[x, y, width, height], ...]
+        }
+    }
+
+Run from app/scripts:
+
+    python benchmark.py ../corpus --output ../logs/bench.json --baseline ../config/bench_baseline.json
+"""
+from matching import Templates, single_scaling, find_all_matches_color, box_iou
+from capture import IMAGE_EXTENSIONS, get_backend, save_frame
+from coordlog import CoordinateLog
+import numpy as np
+import tracemalloc
+import tempfile
+import argparse
+import time
+import json
+import cv2
+import sys
+import os
+
+STAGES = ('single_scaling', 'find_all_matches_color', 'analyze', 'Log.optimize', 'ocr')
+
+def load_corpus(directory: str) -> list:
+    """Returns [(frame path, labels)] in name order."""
+    labels_path = os.path.join(directory, 'labels.json')
+    labels = {}
+    if os.path.exists(labels_path):
+        with open(labels_path, mode='r') as json_file:
+            labels = json.load(json_file)
+    frames = sorted(name for name in os.listdir(directory) if name.lower().endswith(IMAGE_EXTENSIONS))
+    return [(os.path.join(directory, name), labels.get(name, {})) for name in frames]
+
+def load_frame(path: str) -> np.ndarray:
+    # Same BGR channel order as the capture backends
+    return cv2.imread(path, cv2.IMREAD_COLOR)
+
+def record_corpus(directory: str, frames: int = 20, interval: float = 1.0) -> None:
+    # Capture live frames to label later
+    os.makedirs(directory, exist_ok=True)
+    capture = get_backend()
+    for i in range(frames):
+        save_frame(os.path.join(directory, f"frame_{i:03d}.png"), capture.grab())
+        time.sleep(interval)
+
+def summarize(samples: list) -> dict:
+    if not samples:
+        return None
+    samples = np.asarray(samples) * 1000.0
+    return {
+        "n": int(len(samples)),
+        "mean_ms": float(samples.mean()),
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+    }
+
+def score_detections(predicted, truth, iou_threshold: float = 0.5) -> tuple:
+    """Greedy one-to-one matching by IoU; returns (tp, fp, fn)."""
+    truth = np.asarray(truth, dtype=np.float64).reshape(-1, 4)
+    unmatched = np.ones(len(truth), dtype=bool)
+    tp = 0
+    for box in predicted:
+        if not unmatched.any():
+            break
+        ious = box_iou(box, truth)
+        ious[~unmatched] = 0
+        best = int(np.argmax(ious))
+        if ious[best] >= iou_threshold:
+            unmatched[best] = False
+            tp += 1
+    return tp, len(predicted) - tp, int(unmatched.sum())
+
+class Benchmark:
+    def __init__(self, corpus: str, thresholds: tuple = (0.7, 0.8, 0.9, 0.95, 0.99), repeat: int = 1,
+                 stages: tuple = STAGES) -> None:
+        self.corpus: str = corpus
+        self.frames: list = load_corpus(corpus)
+        self.thresholds: tuple = tuple(sorted(thresholds))
+        self.repeat: int = repeat
+        self.stages: tuple = stages
+        self.timings: dict = {stage: [] for stage in STAGES}
+        self.skipped: dict = {}
+        self.counts: dict = {}
+
+    def templates(self) -> list:
+        names = set()
+        for _, labels in self.frames:
+            names.update(labels.get('boxes', {}))
+        return sorted(names)
+
+    def time(self, stage: str, fn, *args, **kwargs) -> any:
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.timings[stage].append(time.perf_counter() - start)
+        return result
+
+    def run_matchers(self) -> None:
+        lowest = self.thresholds[0]
+        for path, labels in self.frames:
+            frame = load_frame(path)
+            for template_path in labels.get('boxes', {}):
+                template = Templates.get(template_path)
+                if template is None:
+                    self.skipped[template_path] = "template not found"
+                    continue
+                for _ in range(self.repeat):
+                    if 'single_scaling' in self.stages:
+                        self.time('single_scaling', single_scaling, frame, template, lowest)
+                    if 'find_all_matches_color' in self.stages:
+                        matches = self.time('find_all_matches_color', find_all_matches_color, frame, template, lowest)
+
+                # Accuracy per threshold from the lowest-threshold detections
+                truth = labels['boxes'][template_path]
+                matches = find_all_matches_color(frame, template, lowest)
+                for threshold in self.thresholds:
+                    kept = matches[matches[:, 4] >= threshold][:, :4]
+                    tp, fp, fn = score_detections(kept, truth)
+                    counts = self.counts.setdefault(template_path, {}).setdefault(threshold, [0, 0, 0])
+                    counts[0] += tp
+                    counts[1] += fp
+                    counts[2] += fn
+
+    def run_analyze(self) -> None:
+        # analyze() captures through the replay backend so the whole path runs headless
+        os.environ['LOCATOR_CAPTURE'] = f"replay:{self.corpus}"
+        try:
+            import main
+        except Exception as e:
+            self.skipped['analyze'] = f"cannot import main: {e}"
+            return
+        main.Log.coords = CoordinateLog(None)
+        main.Log.streams = {}
+        main.Log.CONFIG_PATH = os.path.join(tempfile.mkdtemp(), 'automation_config.json')
+        main.default_capture().rewind()
+        start = time.perf_counter()
+        for _, labels in self.frames:
+            templates = list(labels.get('boxes', {}))
+            if not templates:
+                main.default_capture().grab()
+                continue
+            self.time('analyze', main.analyze_many, templates, get_all_matches=True, match_threshold=self.thresholds[0])
+        self.analyze_seconds = time.perf_counter() - start
+
+    def run_optimizer(self) -> None:
+        from optimizer import Log
+        log = Log()
+        log.coords = CoordinateLog(None)
+        log.streams = {}
+        log.CONFIG_PATH = os.path.join(tempfile.mkdtemp(), 'automation_config.json')
+        for _, labels in self.frames:
+            for template_path, boxes in labels.get('boxes', {}).items():
+                for x1, y1, x2, y2 in boxes:
+                    log.record(template_path, (x1, y1), (x2, y2))
+                self.time('Log.optimize', log.optimize, template_path)
+
+    def run_ocr(self) -> None:
+        from ocr import OCRReader, OCRCache
+        reader = OCRReader(cache=OCRCache(max_entries=0))
+        try:
+            for path, labels in self.frames:
+                frame = load_frame(path)
+                for x, y, width, height in labels.get('ocr', []):
+                    self.time('ocr', reader.text, frame[y:y + height, x:x + width])
+        except Exception as e:
+            self.skipped['ocr'] = f"OCR unavailable: {e}"
+
+    def run(self) -> dict:
+        tracemalloc.start()
+        start = time.perf_counter()
+        self.analyze_seconds = None
+        if 'single_scaling' in self.stages or 'find_all_matches_color' in self.stages:
+            self.run_matchers()
+        if 'analyze' in self.stages:
+            self.run_analyze()
+        if 'Log.optimize' in self.stages:
+            self.run_optimizer()
+        if 'ocr' in self.stages:
+            self.run_ocr()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        accuracy = {}
+        for template_path, per_threshold in self.counts.items():
+            accuracy[template_path] = {}
+            for threshold, (tp, fp, fn) in per_threshold.items():
+                accuracy[template_path][str(threshold)] = {
+                    "precision": tp / (tp + fp) if tp + fp else 1.0,
+                    "recall": tp / (tp + fn) if tp + fn else 1.0,
+                    "tp": tp, "fp": fp, "fn": fn
+                }
+
+        return {
+            "corpus": self.corpus,
+            "frames": len(self.frames),
+            "created": time.strftime('%Y-%m-%d %H:%M:%S'),
+            "elapsed_s": elapsed,
+            "fps": len(self.frames) / self.analyze_seconds if self.analyze_seconds else None,
+            "peak_memory_mb": peak / 2**20,
+            "stages": {stage: summarize(samples) for stage, samples in self.timings.items() if samples},
+            "accuracy": accuracy,
+            "skipped": self.skipped
+        }
+
+def compare(results: dict, baseline: dict, latency_tolerance: float = 0.2, accuracy_tolerance: float = 0.02) -> list:
+    """Lists regressions of results against baseline: slower p95 or lower precision/recall."""
+    regressions = []
+    for stage, stats in baseline.get("stages", {}).items():
+        current = results["stages"].get(stage)
+        if current and stats and current["p95_ms"] > stats["p95_ms"] * (1 + latency_tolerance):
+            regressions.append(f"{stage}: p95 {current['p95_ms']:.2f}ms vs {stats['p95_ms']:.2f}ms")
+    for template_path, per_threshold in baseline.get("accuracy", {}).items():
+        for threshold, stats in per_threshold.items():
+            current = results["accuracy"].get(template_path, {}).get(threshold)
+            if current is None:
+                continue
+            for metric in ("precision", "recall"):
+                if current[metric] < stats[metric] - accuracy_tolerance:
+                    regressions.append(f"{template_path} @ {threshold}: {metric} {current[metric]:.3f} vs {stats[metric]:.3f}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a labeled frame corpus through the matcher and report latency and accuracy.")
+    parser.add_argument("corpus")
+    parser.add_argument("--output", default=None, help="Write results JSON here.")
+    parser.add_argument("--baseline", default=None, help="Compare against a stored results JSON.")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.7, 0.8, 0.9, 0.95, 0.99])
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--latency-tolerance", type=float, default=0.2)
+    parser.add_argument("--record", type=int, default=0, help="Record this many live frames into the corpus and exit.")
+    args = parser.parse_args()
+
+    if args.record:
+        record_corpus(args.corpus, frames=args.record)
+        sys.exit(0)
+
+    results = Benchmark(args.corpus, thresholds=args.thresholds, repeat=args.repeat, stages=tuple(args.stages)).run()
+    print(json.dumps({key: results[key] for key in ("frames", "fps", "peak_memory_mb", "stages", "skipped")}, indent=4))
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, mode='w') as json_file:
+            json.dump(results, json_file, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, mode='r') as json_file:
+            regressions = compare(results, json.load(json_file), latency_tolerance=args.latency_tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,144 @@
+"""
+Per-template calibration over a labeled frame corpus (the format benchmark.py reads).
+
+For every template with ground-truth boxes, each matching mode and pyramid level
+is tried at a low floor threshold. A setting qualifies when it finds every labeled
+box and its weakest true match still outscores its strongest false one by
+`margin`. The fastest qualifying setting wins. Its threshold is set just above the
+strongest false match, and its search region is the padded union of the labeled
+boxes.
+
+Run from app/scripts:
+
+    python calibrate.py ../corpus --output ../config/profiles.json
+"""
+from matching import MATCH_MODES, Templates, find_all_matches_color, box_iou
+from benchmark import load_corpus, load_frame
+from profiles import Profiles
+import numpy as np
+import argparse
+import time
+import json
+
+def classify_scores(peaks, truth, iou_threshold: float = 0.5) -> tuple:
+    """Splits peak scores into (true, false) lists and counts labeled boxes left unmatched."""
+    truth = np.asarray(truth, dtype=np.float64).reshape(-1, 4)
+    unmatched = np.ones(len(truth), dtype=bool)
+    true_scores, false_scores = [], []
+    for box in peaks:
+        ious = box_iou(box, truth) if len(truth) else np.zeros(0)
+        if len(ious):
+            ious[~unmatched] = 0
+        best = int(np.argmax(ious)) if len(ious) else -1
+        if best >= 0 and ious[best] >= iou_threshold:
+            unmatched[best] = False
+            true_scores.append(float(box[4]))
+        else:
+            false_scores.append(float(box[4]))
+    return true_scores, false_scores, int(unmatched.sum())
+
+def search_region(boxes: list, frame_size: tuple, pad: int) -> list:
+    # Padded union of every labeled box, clipped to the frame, as (x, y, width, height)
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    width, height = frame_size
+    x1, y1 = max(0, int(boxes[:, 0].min()) - pad), max(0, int(boxes[:, 1].min()) - pad)
+    x2, y2 = min(width, int(boxes[:, 2].max()) + pad), min(height, int(boxes[:, 3].max()) + pad)
+    return [x1, y1, x2 - x1, y2 - y1]
+
+class Calibrator:
+    def __init__(self, corpus: str, modes: tuple = MATCH_MODES, pyramid_levels: tuple = (0, 1, 2),
+                 floor: float = 0.5, margin: float = 0.05, pad: int = 24) -> None:
+        self.frames: list = [(load_frame(path), labels) for path, labels in load_corpus(corpus)]
+        self.modes: tuple = modes
+        self.pyramid_levels: tuple = pyramid_levels
+        self.floor: float = floor
+        self.margin: float = margin
+        self.pad: int = pad
+
+    def templates(self) -> list:
+        names = set()
+        for _, labels in self.frames:
+            names.update(labels.get('boxes', {}))
+        return sorted(names)
+
+    def trial(self, template, mode: str, level: int) -> dict:
+        true_scores, false_scores, missed, seconds = [], [], 0, 0.0
+        for frame, labels in self.frames:
+            truth = labels.get('boxes', {}).get(template.path)
+            if truth is None:
+                continue
+            start = time.perf_counter()
+            peaks = find_all_matches_color(frame, template, self.floor, mode=mode, pyramid_levels=level)
+            seconds += time.perf_counter() - start
+            hits, misses, unmatched = classify_scores(peaks, truth)
+            true_scores += hits
+            false_scores += misses
+            missed += unmatched
+        weakest_true = min(true_scores) if true_scores else None
+        strongest_false = max(false_scores) if false_scores else self.floor
+        return {
+            "match_mode": mode,
+            "pyramid_levels": level,
+            "missed": missed,
+            "weakest_true": weakest_true,
+            "strongest_false": strongest_false,
+            "separation": weakest_true - strongest_false if weakest_true is not None else None,
+            "seconds": seconds
+        }
+
+    def calibrate(self, template_path: str) -> dict:
+        """Profile for one template, or None when no setting separates it cleanly."""
+        template = Templates.get(template_path)
+        if template is None:
+            print(f"Target image {template_path} not found!")
+            return None
+
+        trials = [self.trial(template, mode, level) for mode in self.modes for level in self.pyramid_levels]
+        usable = [trial for trial in trials if not trial["missed"] and trial["separation"] is not None
+                  and trial["separation"] >= self.margin]
+        if not usable:
+            print(f"    {template_path}: no mode separates true from false matches by {self.margin}.")
+            return None
+        best = min(usable, key=lambda trial: (trial["seconds"], -trial["separation"]))
+
+        boxes, frame_size = [], None
+        for frame, labels in self.frames:
+            boxes += labels.get('boxes', {}).get(template_path, [])
+            frame_size = frame.shape[1::-1]
+        return {
+            # Lowest threshold still above every false match, with half the margin as headroom
+            "match_threshold": round(best["strongest_false"] + self.margin / 2, 3),
+            "match_mode": best["match_mode"],
+            "pyramid_levels": best["pyramid_levels"],
+            "optimize_region": search_region(boxes, frame_size, self.pad),
+            "separation": round(best["separation"], 3),
+            "frames": sum(1 for _, labels in self.frames if template_path in labels.get('boxes', {})),
+            "calibrated": time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+    def run(self, templates: list = None) -> dict:
+        profiles = {}
+        for template_path in templates or self.templates():
+            profile = self.calibrate(template_path)
+            if profile is not None:
+                profiles[template_path] = profile
+                print(f"    {template_path}: {profile}")
+        return profiles
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune per-template threshold, search region, matching mode and pyramid level.")
+    parser.add_argument("corpus")
+    parser.add_argument("--output", default="../config/profiles.json")
+    parser.add_argument("--templates", nargs="+", default=None, help="Only calibrate these templates.")
+    parser.add_argument("--modes", nargs="+", choices=MATCH_MODES, default=list(MATCH_MODES))
+    parser.add_argument("--pyramid-levels", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--floor", type=float, default=0.5)
+    parser.add_argument("--margin", type=float, default=0.05)
+    parser.add_argument("--pad", type=int, default=24)
+    args = parser.parse_args()
+
+    calibrator = Calibrator(args.corpus, modes=tuple(args.modes), pyramid_levels=tuple(args.pyramid_levels),
+                            floor=args.floor, margin=args.margin, pad=args.pad)
+    profiles = calibrator.run(args.templates)
+    Profiles(args.output).save(profiles)
+    print(json.dumps({"calibrated": len(profiles), "output": args.output}, indent=4))
@@ -0,0 +1,172 @@
+import threading
+import numpy as np
+import cv2
+import os
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+def crop(frame, region: tuple = None):
+    """Zero-copy view of frame for an (x, y, width, height) region, clipped to the frame."""
+    if not region:
+        return frame
+    x, y, width, height = (int(round(v)) for v in region)
+    x, y = max(0, x), max(0, y)
+    return frame[y:y + max(0, height), x:x + max(0, width)]
+
+class CaptureBackend:
+    """
+    Returns screen frames as contiguous H x W x 3 uint8 BGR arrays, the channel
+    order cv2.imread gives templates, so frames are normalized once here.
+    """
+    name: str = 'base'
+
+    def grab(self, region: tuple = None) -> np.ndarray:
+        raise NotImplementedError
+
+    def size(self) -> tuple:
+        frame = self.grab()
+        return frame.shape[1], frame.shape[0]
+
+class PyAutoGUICapture(CaptureBackend):
+    name: str = 'pyautogui'
+
+    def __init__(self) -> None:
+        import pyautogui
+        self._pyautogui = pyautogui
+
+    def grab(self, region: tuple = None) -> np.ndarray:
+        screenshot = self._pyautogui.screenshot(region=region) if region else self._pyautogui.screenshot()
+        if screenshot.mode != 'RGB':
+            screenshot = screenshot.convert('RGB')
+        return cv2.cvtColor(np.asarray(screenshot), cv2.COLOR_RGB2BGR)
+
+    def size(self) -> tuple:
+        return tuple(self._pyautogui.size())
+
+class MSSCapture(CaptureBackend):
+    """Native capture through python-mss; one converting copy from the BGRA buffer."""
+    name: str = 'mss'
+
+    def __init__(self) -> None:
+        import mss
+        self._mss = mss
+        self._local = threading.local()
+
+    def _sct(self) -> any:
+        # mss handles are not shareable across threads
+        sct = getattr(self._local, 'sct', None)
+        if sct is None:
+            sct = self._local.sct = self._mss.mss()
+        return sct
+
+    def _monitor(self) -> dict:
+        return self._sct().monitors[1]
+
+    def grab(self, region: tuple = None) -> np.ndarray:
+        monitor = self._monitor()
+        if region:
+            x, y, width, height = (int(v) for v in region)
+            monitor = {"left": monitor["left"] + x, "top": monitor["top"] + y, "width": width, "height": height}
+        shot = self._sct().grab(monitor)
+        bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+        return cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR)
+
+    def size(self) -> tuple:
+        monitor = self._monitor()
+        return monitor["width"], monitor["height"]
+
+class ReplayCapture(CaptureBackend):
+    """
+    Replays recorded frames from a directory of images (in name order) or a video
+    file, so the matcher can run headless. Each grab() advances one frame.
+    """
+    name: str = 'replay'
+
+    def __init__(self, source: str, loop: bool = True) -> None:
+        self.source: str = source
+        self.loop: bool = loop
+        self.index: int = 0
+        self._lock = threading.Lock()
+        self._video = None
+        self._files: list = None
+
+        if os.path.isdir(source):
+            self._files = sorted(
+                os.path.join(source, name) for name in os.listdir(source)
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+            if not self._files:
+                raise FileNotFoundError(f"No frames found in {source}.")
+        else:
+            self._video = cv2.VideoCapture(source)
+            if not self._video.isOpened():
+                raise FileNotFoundError(f"Cannot open video {source}.")
+
+    def __len__(self) -> int:
+        if self._files is not None:
+            return len(self._files)
+        return int(self._video.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    @property
+    def current(self) -> str:
+        # Path of the frame the last grab() returned (directory sources only)
+        if self._files is None or self.index == 0:
+            return None
+        return self._files[(self.index - 1) % len(self._files)]
+
+    def _next_bgr(self) -> np.ndarray:
+        if self._files is not None:
+            if self.index >= len(self._files):
+                if not self.loop:
+                    raise StopIteration
+                self.index = 0
+            bgr = cv2.imread(self._files[self.index], cv2.IMREAD_COLOR)
+            self.index += 1
+            return bgr
+
+        ok, bgr = self._video.read()
+        if not ok and self.loop:
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, bgr = self._video.read()
+        if not ok:
+            raise StopIteration
+        self.index += 1
+        return bgr
+
+    def grab(self, region: tuple = None) -> np.ndarray:
+        with self._lock:
+            bgr = self._next_bgr()
+        return np.ascontiguousarray(crop(bgr, region))
+
+    def rewind(self) -> None:
+        with self._lock:
+            self.index = 0
+            if self._video is not None:
+                self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def size(self) -> tuple:
+        if self._video is not None:
+            return int(self._video.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self._video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        height, width = cv2.imread(self._files[0], cv2.IMREAD_COLOR).shape[:2]
+        return width, height
+
+def get_backend(name: str = None) -> CaptureBackend:
+    """
+    Picks a capture backend by name: 'mss', 'pyautogui' or 'replay:<dir or video>'.
+    Defaults to $LOCATOR_CAPTURE, then mss when installed, then pyautogui.
+    """
+    name = name or os.environ.get('LOCATOR_CAPTURE', '')
+    if name.startswith('replay:'):
+        return ReplayCapture(name[len('replay:'):])
+    if name == 'pyautogui':
+        return PyAutoGUICapture()
+    if name == 'mss':
+        return MSSCapture()
+    try:
+        return MSSCapture()
+    except ImportError:
+        return PyAutoGUICapture()
+
+def save_frame(path: str, frame: np.ndarray, params: list = None) -> bool:
+    # Frames are BGR already, as cv2.imwrite expects
+    return cv2.imwrite(path, frame, params or [])
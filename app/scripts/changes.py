@@ -0,0 +1,131 @@
+from matching import non_max_suppression
+from frame import Frame
+import threading
+import numpy as np
+import cv2
+
+class ChangeDetector:
+    """
+    Block-wise change detection between consecutive frames of one stream.
+
+    update(frame, key) compares the frame's gray view with the previous frame of
+    the same key and returns (generation, rects): the changed areas as
+    (x, y, width, height) rectangles, one per connected group of blocks whose
+    largest pixel difference exceeds tolerance, and the frame's number within
+    the stream. An empty list means nothing changed; None means there was nothing
+    to compare against (first frame, or the frame size changed).
+    """
+    def __init__(self, block: int = 32, tolerance: int = 8) -> None:
+        self.block: int = block
+        self.tolerance: int = tolerance
+        self._previous: dict = {}
+        self._generations: dict = {}
+        self._lock = threading.Lock()
+
+    def blocks(self, previous, current) -> np.ndarray:
+        # Boolean grid with one cell per block, True where the block changed
+        diff = cv2.absdiff(previous, current)
+        height, width = diff.shape
+        rows, cols = -(-height // self.block), -(-width // self.block)
+        padded = np.zeros((rows * self.block, cols * self.block), np.uint8)
+        padded[:height, :width] = diff
+        return padded.reshape(rows, self.block, cols, self.block).max(axis=(1, 3)) > self.tolerance
+
+    def rectangles(self, dirty: np.ndarray, frame_size: tuple) -> list:
+        width, height = frame_size
+        count, _, stats, _ = cv2.connectedComponentsWithStats(dirty.astype(np.uint8), connectivity=8)
+        rects = []
+        for x, y, w, h, _ in stats[1:count].tolist():
+            x1, y1 = x * self.block, y * self.block
+            rects.append((x1, y1, min(width, (x + w) * self.block) - x1, min(height, (y + h) * self.block) - y1))
+        return rects
+
+    def update(self, frame, key: any = None) -> tuple:
+        """(generation, changed rectangles) since the last frame seen under key."""
+        gray = Frame.wrap(frame).gray
+        with self._lock:
+            previous = self._previous.get(key)
+            self._previous[key] = gray
+            generation = self._generations[key] = self._generations.get(key, 0) + 1
+        if previous is None or previous.shape != gray.shape:
+            return generation, None
+        return generation, self.rectangles(self.blocks(previous, gray), gray.shape[1::-1])
+
+    def reset(self, key: any = None) -> None:
+        with self._lock:
+            self._previous.pop(key, None)
+
+def pad_rect(rect: tuple, template_size: tuple, frame_size: tuple) -> tuple:
+    # Grown by the template size so every match overlapping rect lies wholly inside
+    x, y, width, height = rect
+    template_width, template_height = template_size
+    left, top = max(0, x - template_width), max(0, y - template_height)
+    right = min(frame_size[0], x + width + template_width)
+    bottom = min(frame_size[1], y + height + template_height)
+    return left, top, right - left, bottom - top
+
+def overlaps(boxes: np.ndarray, rect: tuple) -> np.ndarray:
+    x, y, width, height = rect
+    return (boxes[:, 0] < x + width) & (boxes[:, 2] > x) & (boxes[:, 1] < y + height) & (boxes[:, 3] > y)
+
+class MatchCache:
+    """
+    Keeps each search's last match boxes and, given the dirty rectangles of the
+    new frame, reuses the boxes in unchanged areas and re-matches only the dirty
+    rectangles padded by the template size. Boxes are only reused when they were
+    found on the immediately preceding generation of the stream; a search that
+    skipped frames matches in full.
+
+    match(frame) must return an (N, 5+) array of [x1, y1, x2, y2, score, ...]
+    rows in the coordinates of the frame it is given, and must not cap the number
+    of peaks: capping belongs to the caller, after the merge.
+    """
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries: int = max_entries
+        self.results: dict = {}
+        self.reused: int = 0
+        self.rematched_pixels: int = 0
+        self._lock = threading.Lock()
+
+    def search(self, key: any, frame: Frame, changes: tuple, template_size: tuple, match,
+               iou_threshold: float = 0.3) -> np.ndarray:
+        generation, dirty = changes
+        with self._lock:
+            last_generation, previous = self.results.get(key, (None, None))
+        width, height = frame.size
+
+        if previous is None or dirty is None or last_generation != generation - 1:
+            boxes = match(frame)
+            self.rematched_pixels += width * height
+        elif not dirty:
+            boxes = previous
+            self.reused += 1
+        else:
+            keep = np.ones(len(previous), dtype=bool)
+            found = []
+            for rect in dirty:
+                keep &= ~overlaps(previous, rect) if len(previous) else keep
+                x, y, w, h = window = pad_rect(rect, template_size, (width, height))
+                if w < template_size[0] or h < template_size[1]:
+                    continue
+                self.rematched_pixels += w * h
+                peaks = match(frame.crop(window))
+                if len(peaks):
+                    peaks = peaks.copy()
+                    peaks[:, [0, 2]] += x
+                    peaks[:, [1, 3]] += y
+                    found.append(peaks)
+            kept = previous[keep] if len(previous) else previous
+            boxes = np.vstack([kept] + found) if found else kept
+            boxes = non_max_suppression(boxes, iou_threshold=iou_threshold) if len(boxes) else boxes
+
+        with self._lock:
+            self.results.pop(key, None)
+            self.results[key] = generation, boxes
+            while len(self.results) > self.max_entries:
+                self.results.pop(next(iter(self.results)))
+        return boxes
+
+    def clear(self) -> None:
+        with self._lock:
+            self.results.clear()
@@ -0,0 +1,96 @@
+"""
+Client for the locator daemon (daemon.py). Imports only the standard library,
+so a short-lived process can ask for a match without loading OpenCV.
+
+    from client import LocatorClient
+
+    with LocatorClient() as locator:
+        buttons = locator.analyze('../images/Next.png', get_all_matches=True, match_threshold=.99)
+"""
+import socket
+import json
+import os
+
+SOCKET_PATH = os.environ.get('LOCATOR_SOCKET', '../config/locator.sock')
+
+class LocatorError(RuntimeError):
+    """The daemon could not serve a request."""
+
+class LocatorClient:
+    def __init__(self, path: str = SOCKET_PATH, timeout: float = 60.0) -> None:
+        self.path: str = path
+        self.timeout: float = timeout
+        self._socket = None
+        self._file = None
+
+    def connect(self) -> 'LocatorClient':
+        if self._socket is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError as e:
+                sock.close()
+                raise LocatorError(f"No locator daemon on {self.path}: {e}") from e
+            self._socket, self._file = sock, sock.makefile('rwb')
+        return self
+
+    def call(self, op: str, **args) -> any:
+        self.connect()
+        try:
+            self._file.write(json.dumps({"op": op, "args": args}).encode() + b'\n')
+            self._file.flush()
+            line = self._file.readline()
+        except OSError as e:
+            self.close()
+            raise LocatorError(f"Lost connection to {self.path}: {e}") from e
+        if not line:
+            self.close()
+            raise LocatorError(f"The daemon on {self.path} closed the connection.")
+        reply = json.loads(line)
+        if not reply.get("ok"):
+            raise LocatorError(reply.get("error"))
+        return reply.get("result")
+
+    def analyze(self, target_img_path: str = '../images/EasyApply.png', frame: str = None, **options) -> any:
+        """main.analyze() in the daemon; frame is an optional screenshot file to match instead of capturing."""
+        return self.call('analyze', target_img_path=target_img_path, frame=self._path(frame), **options)
+
+    def analyze_many(self, templates, frame: str = None, **options) -> dict:
+        return self.call('analyze_many', templates=templates, frame=self._path(frame), **options)
+
+    def ocr(self, path: str = None, region: tuple = None) -> str:
+        """Text of an image file, or of a screen region (x, y, width, height) the daemon captures."""
+        return self.call('ocr', path=self._path(path), region=list(region) if region else None)
+
+    def ping(self) -> dict:
+        return self.call('ping')
+
+    def stats(self) -> dict:
+        return self.call('stats')
+
+    def flush(self) -> bool:
+        return self.call('flush')
+
+    def shutdown(self) -> None:
+        self.call('shutdown')
+        self.close()
+
+    def _path(self, path: str) -> str:
+        # The daemon may run from another directory
+        return os.path.abspath(path) if path else None
+
+    def close(self) -> None:
+        if self._socket is not None:
+            for handle in (self._file, self._socket):
+                try:
+                    handle.close()
+                except OSError:
+                    pass
+            self._socket = self._file = None
+
+    def __enter__(self) -> 'LocatorClient':
+        return self.connect()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
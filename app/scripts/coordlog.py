@@ -0,0 +1,169 @@
+from ast import literal_eval
+import numpy as np
+import threading
+import hashlib
+import json
+import csv
+import os
+
+class RingBuffer:
+    """
+    Fixed-capacity ring of (x1, y1, x2, y2) boxes kept in a NumPy array.
+
+    With a path the array is a memory-mapped file laid out as a 4 x int64 header
+    (magic, capacity, head, count) followed by capacity x 4 int32 boxes. Appends
+    write one slot and the header; trimming only shrinks count, so the file is
+    never rewritten.
+    """
+    MAGIC = 0x52494e47  # "RING"
+    HEADER_BYTES = 4 * 8
+
+    def __init__(self, path: str = None, capacity: int = 1024) -> None:
+        self.path: str = path
+        self._lock = threading.Lock()
+
+        if path is None:
+            self._header = np.array([self.MAGIC, capacity, 0, 0], dtype=np.int64)
+            self._boxes = np.zeros((capacity, 4), dtype=np.int32)
+            return
+
+        if os.path.exists(path):
+            header = np.memmap(path, dtype=np.int64, mode='r+', shape=(4,))
+            if header[0] != self.MAGIC:
+                raise ValueError(f"{path} is not a coordinate ring file.")
+            capacity = int(header[1])
+        else:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, mode='wb') as file:
+                file.truncate(self.HEADER_BYTES + capacity * 4 * 4)
+            header = np.memmap(path, dtype=np.int64, mode='r+', shape=(4,))
+            header[:] = (self.MAGIC, capacity, 0, 0)
+            header.flush()
+
+        self._header = header
+        self._boxes = np.memmap(path, dtype=np.int32, mode='r+', offset=self.HEADER_BYTES, shape=(capacity, 4))
+
+    @property
+    def capacity(self) -> int:
+        return int(self._header[1])
+
+    def __len__(self) -> int:
+        return int(self._header[3])
+
+    def append(self, box) -> None:
+        with self._lock:
+            capacity, head, count = int(self._header[1]), int(self._header[2]), int(self._header[3])
+            self._boxes[head] = box
+            self._header[2] = (head + 1) % capacity
+            self._header[3] = min(count + 1, capacity)
+
+    def trim(self, max_entries: int) -> int:
+        # Forget everything but the newest max_entries boxes; returns how many were forgotten
+        with self._lock:
+            count = int(self._header[3])
+            self._header[3] = min(count, max(0, max_entries))
+            return count - int(self._header[3])
+
+    def clear(self) -> None:
+        self.trim(0)
+
+    def boxes(self) -> np.ndarray:
+        """Logged boxes oldest first as an (N, 4) int32 array."""
+        with self._lock:
+            capacity, head, count = int(self._header[1]), int(self._header[2]), int(self._header[3])
+            start = (head - count) % capacity
+            if start + count <= capacity:
+                return np.array(self._boxes[start:start + count])
+            return np.concatenate((self._boxes[start:], self._boxes[:head]))
+
+    def flush(self) -> None:
+        if isinstance(self._boxes, np.memmap):
+            self._header.flush()
+            self._boxes.flush()
+
+class CoordinateLog:
+    """One RingBuffer per template under a directory, with an index of template paths."""
+    def __init__(self, directory: str = '../config/coordinates', capacity: int = 1024) -> None:
+        self.directory: str = directory
+        self.capacity: int = capacity
+        self.INDEX_PATH: str = os.path.join(directory, 'index.json') if directory else None
+        self._rings: dict = {}
+        self._index: dict = None
+        self._lock = threading.Lock()
+
+    def _load_index(self) -> dict:
+        if self._index is None:
+            self._index = {}
+            if self.INDEX_PATH and os.path.exists(self.INDEX_PATH):
+                with open(self.INDEX_PATH, mode='r') as json_file:
+                    self._index = json.load(json_file)
+        return self._index
+
+    def _filename(self, template: str) -> str:
+        stem = os.path.splitext(os.path.basename(template))[0] or 'template'
+        digest = hashlib.sha1(template.encode()).hexdigest()[:8]
+        return f"{stem}_{digest}.ring"
+
+    def ring(self, template: str = '') -> RingBuffer:
+        template = template or ''
+        ring = self._rings.get(template)
+        if ring is not None:
+            return ring
+
+        with self._lock:
+            ring = self._rings.get(template)
+            if ring is None:
+                if self.directory is None:
+                    ring = RingBuffer(None, self.capacity)
+                else:
+                    index = self._load_index()
+                    if template not in index:
+                        index[template] = self._filename(template)
+                        os.makedirs(self.directory, exist_ok=True)
+                        with open(self.INDEX_PATH, mode='w') as json_file:
+                            json.dump(index, json_file, indent=4)
+                    ring = RingBuffer(os.path.join(self.directory, index[template]), self.capacity)
+                self._rings[template] = ring
+        return ring
+
+    def templates(self) -> list:
+        return sorted(set(self._load_index()) | set(self._rings))
+
+    def append(self, template: str, top_left: tuple, bottom_right: tuple) -> None:
+        self.ring(template).append((top_left[0], top_left[1], bottom_right[0], bottom_right[1]))
+
+    def limit(self, max_entries: int, template: str = None) -> list:
+        """Trims the rings to their newest max_entries boxes; returns the templates that lost any."""
+        names = [template] if template is not None else self.templates()
+        return [name for name in names if self.ring(name).trim(max_entries)]
+
+    def boxes(self, template: str = None) -> np.ndarray:
+        """Boxes for one template, or for every template when template is None."""
+        if template is not None:
+            return self.ring(template).boxes()
+        boxes = [self.ring(name).boxes() for name in self.templates()]
+        return np.concatenate(boxes) if boxes else np.empty((0, 4), dtype=np.int32)
+
+    def __len__(self) -> int:
+        return sum(len(self.ring(name)) for name in self.templates())
+
+    def import_csv(self, csv_path: str, default_template: str = '') -> int:
+        """Imports a legacy coordinate_log.csv ("(x1, y1)","(x2, y2)"[,template] rows)."""
+        imported = 0
+        with open(csv_path, mode='r') as file:
+            for row in csv.reader(file):
+                if len(row) < 2:
+                    continue
+                try:
+                    top_left = literal_eval(row[0].replace('np.int64', ''))
+                    bottom_right = literal_eval(row[1].replace('np.int64', ''))
+                except (ValueError, SyntaxError):
+                    continue
+                template = row[2] if len(row) > 2 else default_template
+                self.append(template, top_left, bottom_right)
+                imported += 1
+        return imported
+
+    def flush(self) -> None:
+        for ring in self._rings.values():
+            ring.flush()
@@ -0,0 +1,199 @@
+"""
+Long-running locator that keeps templates, learned regions and OCR workers warm
+and serves analyze, analyze_many and OCR requests over a local Unix socket, so
+short-lived callers pay neither the imports nor the cold template loads.
+
+Requests and replies are one JSON object per line:
+
+    {"op": "analyze", "args": {"target_img_path": "../images/Next.png", "get_all_matches": true}}
+    {"ok": true, "result": [[1580, 930]]}
+
+Template paths are resolved from the daemon's working directory. client.py is
+the client library. Run from app/scripts:
+
+    python daemon.py --socket ../config/locator.sock
+"""
+from socketserver import ThreadingUnixStreamServer, StreamRequestHandler
+from ocr import OCRService
+import main
+import numpy as np
+import threading
+import argparse
+import socket
+import glob
+import json
+import time
+import cv2
+import os
+
+SOCKET_PATH = os.environ.get('LOCATOR_SOCKET', '../config/locator.sock')
+
+# JSON has no tuples; these arguments are hashed or unpacked as tuples downstream
+TUPLE_ARGS = ('optimize_region', 'restrict_region', 'scales')
+
+def encode(value) -> any:
+    # json.dumps fallback for numpy results
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable.")
+
+def normalize(options: dict) -> dict:
+    options = dict(options or {})
+    for key in TUPLE_ARGS:
+        if isinstance(options.get(key), list):
+            options[key] = tuple(options[key])
+    return options
+
+def load_image(path: str) -> np.ndarray:
+    image = cv2.imread(path, cv2.IMREAD_COLOR)
+    if image is None:
+        raise FileNotFoundError(f"Cannot read image {path}.")
+    return image
+
+class Locator:
+    """The request handlers, on top of main's warm module-level state."""
+    def __init__(self) -> None:
+        self.started: float = time.time()
+        self.requests: int = 0
+        self.ops: dict = {
+            'ping': self.ping,
+            'stats': self.stats,
+            'analyze': self.analyze,
+            'analyze_many': self.analyze_many,
+            'ocr': self.ocr,
+            'flush': self.flush
+        }
+
+    def warm(self, images: str = '../images') -> dict:
+        # Templates, their feature index, learned regions, profiles and (with tesserocr) one OCR worker
+        paths = sorted(glob.glob(os.path.join(images, '*.png')))
+        templates = main.Templates.preload(paths)
+        features = main.Features.add_many(paths)
+        main.Features.build()
+        regions = sum(1 for template in main.Log.coords.templates() if main.Log.region(template) is not None)
+        main.Profiles.load()
+        if main.OCR.service is None:
+            main.OCR.service = OCRService()
+        # Only tesserocr workers keep state between calls; pytesseract starts a process per call
+        if main.OCR.service.backend == 'tesserocr':
+            try:
+                main.OCR.service.recognize(np.full((32, 32), 255, np.uint8))
+            except Exception as e:
+                print(f"    OCR warm-up skipped: {e}")
+        return {"templates": templates, "features": features, "regions": regions, "ocr_backend": main.OCR.service.backend}
+
+    def handle(self, request: dict) -> dict:
+        self.requests += 1
+        op = self.ops.get(request.get('op'))
+        if op is None:
+            return {"ok": False, "error": f"Unknown op {request.get('op')!r}, expected one of {sorted(self.ops)}."}
+        try:
+            return {"ok": True, "result": op(**request.get('args', {}))}
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    def ping(self) -> dict:
+        return {"pid": os.getpid(), "uptime": time.time() - self.started}
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "uptime": time.time() - self.started,
+            "templates": len(main.Templates),
+            "ocr_cache": {"hits": main.OCR.cache.hits, "misses": main.OCR.cache.misses},
+            "reused_matches": main.Matches.reused
+        }
+
+    def analyze(self, frame: str = None, **options) -> any:
+        # frame is the path of an already captured screenshot; by default the daemon captures
+        return main.analyze(frame=load_image(frame) if frame else None, **normalize(options))
+
+    def analyze_many(self, templates, frame: str = None, **options) -> dict:
+        if isinstance(templates, dict):
+            templates = {path: normalize(overrides) for path, overrides in templates.items()}
+        return main.analyze_many(templates, frame=load_image(frame) if frame else None, **normalize(options))
+
+    def ocr(self, path: str = None, region: list = None) -> str:
+        # Text of an image file, or of a screen region captured by the daemon
+        image = load_image(path) if path else main.capture(tuple(region) if region else None)
+        return main.OCR.text(image)
+
+    def flush(self) -> bool:
+        return main.Log.flush()
+
+class LocatorHandler(StreamRequestHandler):
+    def handle(self) -> None:
+        # One connection serves any number of requests
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                reply = {"ok": False, "error": f"Malformed request: {e}"}
+            else:
+                if request.get('op') == 'shutdown':
+                    self.reply({"ok": True, "result": None})
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+                reply = self.server.locator.handle(request)
+            self.reply(reply)
+
+    def reply(self, reply: dict) -> None:
+        self.wfile.write(json.dumps(reply, default=encode).encode() + b'\n')
+        self.wfile.flush()
+
+class LocatorServer(ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str = SOCKET_PATH, locator: Locator = None) -> None:
+        self.locator: Locator = locator or Locator()
+        self.path: str = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.remove_stale(path)
+        super().__init__(path, LocatorHandler)
+        # Local user only
+        os.chmod(path, 0o600)
+
+    @staticmethod
+    def remove_stale(path: str) -> None:
+        if not os.path.exists(path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            os.remove(path)
+        else:
+            raise RuntimeError(f"A locator daemon is already listening on {path}.")
+        finally:
+            probe.close()
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def serve(path: str = SOCKET_PATH, warm: bool = True) -> None:
+    locator = Locator()
+    if warm:
+        print(f"    Warmed: {locator.warm()}")
+    server = LocatorServer(path, locator)
+    print(f"[ Locator daemon listening on {path} ]")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        main.Log.flush()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve analyze, analyze_many and OCR over a local Unix socket.")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--no-warm", action="store_true", help="Skip preloading templates and OCR workers.")
+    args = parser.parse_args()
+    try:
+        serve(args.socket, warm=not args.no_warm)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,217 @@
+from matching import Templates, non_max_suppression
+from frame import Frame
+import threading
+import numpy as np
+import cv2
+
+FEATURE_MODES = ('gray', 'edge')
+
+# FLANN's locality-sensitive hashing for binary descriptors
+LSH_PARAMS = dict(algorithm=6, table_number=6, key_size=12, multi_probe_level=1)
+
+class FeatureIndex:
+    """
+    ORB keypoints and descriptors of every template in one matching index.
+
+    detect() extracts the frame's descriptors once and matches them against all
+    indexed templates in a single kNN query. Matches that pass the ratio test
+    vote for where their template's center would be, given each keypoint's
+    scale and orientation; every voting cluster is verified with a RANSAC
+    homography, and its projected corners become a box. One lookup therefore
+    finds every template at any scale, and in 'edge' mode (ORB on the Sobel
+    magnitude) light and dark themes of a button alike.
+
+    Boxes are scored by the fraction of the template's keypoints that are
+    homography inliers, so scores are not comparable to TM_CCOEFF_NORMED ones.
+    matcher is 'bf' (brute-force Hamming, fastest for a few dozen templates) or
+    'lsh' (FLANN multi-probe LSH, for large template libraries).
+    """
+    def __init__(self, mode: str = 'edge', template_features: int = 1000, frame_features: int = 40000,
+                 ratio: float = 0.8, min_inliers: int = 10, reprojection: float = 4.0,
+                 scale_range: tuple = (0.5, 2.0), max_rotation: float = 20.0, matcher: str = 'bf') -> None:
+        if mode not in FEATURE_MODES:
+            raise ValueError(f"Unknown feature mode {mode!r}, expected one of {FEATURE_MODES}.")
+        self.mode: str = mode
+        self.ratio: float = ratio
+        self.min_inliers: int = min_inliers
+        self.reprojection: float = reprojection
+        self.scale_range: tuple = scale_range
+        self.max_rotation: float = max_rotation
+        self.matcher: str = matcher
+        # Small patches so buttons a few dozen pixels tall still get keypoints
+        self._template_orb = cv2.ORB_create(template_features, edgeThreshold=15, patchSize=15, fastThreshold=10)
+        self._frame_orb = cv2.ORB_create(frame_features, edgeThreshold=15, patchSize=15, fastThreshold=10)
+        self.templates: dict = {}
+        self._index = None
+        self._labels = None
+        self._lock = threading.Lock()
+
+    def _image(self, frame: Frame) -> np.ndarray:
+        return frame.edges if self.mode == 'edge' else frame.gray
+
+    def add(self, path: str) -> bool:
+        """Indexes a template; reindexes it when the file changed. False when it cannot be used."""
+        template = Templates.get(path)
+        if template is None:
+            return False
+        with self._lock:
+            entry = self.templates.get(path)
+            if entry is not None and entry['mtime'] == template.mtime:
+                return entry['descriptors'] is not None
+
+        # Replicated borders let keypoints sit right at the template's edges
+        pad = 15
+        image = cv2.copyMakeBorder(self._image(Frame(template.bgr)), pad, pad, pad, pad, cv2.BORDER_REPLICATE)
+        keypoints, descriptors = self._template_orb.detectAndCompute(image, None)
+        width, height = template.size
+        entry = {
+            'mtime': template.mtime,
+            'size': (width, height),
+            'points': np.float32([kp.pt for kp in keypoints]).reshape(-1, 2) - pad,
+            'sizes': np.float32([kp.size for kp in keypoints]),
+            'angles': np.float32([kp.angle for kp in keypoints]),
+            'descriptors': descriptors if descriptors is not None and len(descriptors) >= self.min_inliers else None
+        }
+        if entry['descriptors'] is None:
+            print(f"    {path}: too few keypoints for feature matching.")
+        with self._lock:
+            self.templates[path] = entry
+            self._index = None
+        return entry['descriptors'] is not None
+
+    def add_many(self, paths: list) -> int:
+        return sum(1 for path in paths if self.add(path))
+
+    def build(self) -> None:
+        # Every template's descriptors stacked into one train set; _labels maps rows back to templates
+        with self._lock:
+            if self._index is not None:
+                return
+            usable = [(path, entry) for path, entry in self.templates.items() if entry['descriptors'] is not None]
+            if not usable:
+                self._index, self._labels = False, None
+                return
+            descriptors = np.vstack([entry['descriptors'] for _, entry in usable])
+            self._labels = (
+                np.concatenate([np.full(len(entry['descriptors']), i) for i, (_, entry) in enumerate(usable)]),
+                np.concatenate([np.arange(len(entry['descriptors'])) for _, entry in usable]),
+                [path for path, _ in usable]
+            )
+            if self.matcher == 'lsh':
+                index = cv2.FlannBasedMatcher(LSH_PARAMS, dict(checks=64))
+            else:
+                index = cv2.BFMatcher(cv2.NORM_HAMMING)
+            index.add([descriptors])
+            index.train()
+            self._index = index
+
+    def detect(self, frame, paths: list = None, max_results: int = None, iou_threshold: float = 0.3) -> dict:
+        """
+        {template path: (N, 6) array of [x1, y1, x2, y2, score, scale]} for paths (every
+        indexed template by default), in the frame's coordinates, best first.
+        """
+        paths = list(self.templates) if paths is None else list(paths)
+        for path in paths:
+            self.add(path)
+        self.build()
+        results = {path: np.empty((0, 6)) for path in paths}
+        if not self._index:
+            return results
+
+        frame = Frame.wrap(frame)
+        keypoints, descriptors = self._frame_orb.detectAndCompute(self._image(frame), None)
+        if descriptors is None or len(descriptors) < 2:
+            return results
+
+        with self._lock:
+            index, (owners, rows, indexed) = self._index, self._labels
+            knn = index.knnMatch(descriptors, k=2)
+
+        # Ratio test, then group the surviving matches by template
+        wanted = {indexed.index(path) for path in paths if path in indexed}
+        grouped = {}
+        for pair in knn:
+            if len(pair) < 2 or pair[0].distance >= self.ratio * pair[1].distance:
+                continue
+            owner = int(owners[pair[0].trainIdx])
+            if owner in wanted:
+                grouped.setdefault(owner, []).append((pair[0].queryIdx, int(rows[pair[0].trainIdx])))
+
+        frame_points = np.float32([kp.pt for kp in keypoints])
+        frame_sizes = np.float32([kp.size for kp in keypoints])
+        frame_angles = np.float32([kp.angle for kp in keypoints])
+        for owner, matches in grouped.items():
+            if len(matches) < self.min_inliers:
+                continue
+            path = indexed[owner]
+            query, train = np.array(matches).T
+            boxes = self.verify(self.templates[path], frame_points[query], frame_sizes[query], frame_angles[query], train,
+                                frame.size)
+            if len(boxes):
+                results[path] = non_max_suppression(boxes, iou_threshold=iou_threshold, max_results=max_results)
+        return results
+
+    def verify(self, entry: dict, points: np.ndarray, sizes: np.ndarray, angles: np.ndarray, train: np.ndarray,
+               frame_size: tuple) -> np.ndarray:
+        # Each match votes for its template instance's center; every dense cluster gets a homography
+        width, height = entry['size']
+        template_points = entry['points'][train]
+        scale = sizes / entry['sizes'][train]
+        rotation = (angles - entry['angles'][train] + 180) % 360 - 180
+        theta = np.deg2rad(rotation)
+        offset = np.float32([width / 2, height / 2]) - template_points
+        centers = points + scale[:, None] * np.column_stack((
+            np.cos(theta) * offset[:, 0] - np.sin(theta) * offset[:, 1],
+            np.sin(theta) * offset[:, 0] + np.cos(theta) * offset[:, 1]
+        ))
+        # On-screen buttons are upright, so keypoint orientations must agree too
+        plausible = ((np.abs(rotation) <= self.max_rotation) & (scale >= self.scale_range[0]) & (scale <= self.scale_range[1]) &
+                     (centers[:, 0] >= 0) & (centers[:, 0] < frame_size[0]) &
+                     (centers[:, 1] >= 0) & (centers[:, 1] < frame_size[1]))
+        if plausible.sum() < self.min_inliers:
+            return np.empty((0, 6))
+        points, template_points, centers = points[plausible], template_points[plausible], centers[plausible]
+
+        # Votes per cell, summed over each cell's 3 x 3 neighbourhood so instances straddling a cell edge stay whole
+        cell = max(8.0, min(width, height) / 2)
+        bins = np.floor(centers / cell).astype(np.int64)
+        grid = np.zeros((int(frame_size[1] // cell) + 1, int(frame_size[0] // cell) + 1), np.float32)
+        np.add.at(grid, (bins[:, 1], bins[:, 0]), 1)
+        votes = cv2.boxFilter(grid, -1, (3, 3), normalize=False, borderType=cv2.BORDER_CONSTANT)
+        candidates = np.argwhere(votes >= self.min_inliers)
+        candidates = candidates[np.argsort(-votes[candidates[:, 0], candidates[:, 1]], kind='stable')]
+
+        unused = np.ones(len(points), dtype=bool)
+        corners = np.float32([[0, 0], [width, 0], [width, height], [0, height]]).reshape(-1, 1, 2)
+        found = []
+        for row, col in candidates:
+            members = unused & (np.abs(bins[:, 1] - row) <= 1) & (np.abs(bins[:, 0] - col) <= 1)
+            if members.sum() < self.min_inliers:
+                continue
+            H, mask = cv2.findHomography(template_points[members], points[members], cv2.RANSAC, self.reprojection,
+                                          maxIters=500)
+            if H is None:
+                continue
+            inliers = int(mask.sum())
+            box = self.box(H, corners, (width, height))
+            if inliers < self.min_inliers or box is None:
+                continue
+            unused[np.flatnonzero(members)[mask.ravel() > 0]] = False
+            x1, y1, x2, y2, box_scale = box
+            found.append([x1, y1, x2, y2, inliers / len(entry['points']), box_scale])
+        found = np.array(found, dtype=np.float64).reshape(-1, 6)
+        found[:, [0, 2]] = found[:, [0, 2]].clip(0, frame_size[0])
+        found[:, [1, 3]] = found[:, [1, 3]].clip(0, frame_size[1])
+        return found
+
+    def box(self, H: np.ndarray, corners: np.ndarray, size: tuple) -> tuple:
+        # Rejects degenerate homographies: folded quads and implausible scales
+        projected = cv2.perspectiveTransform(corners, H).reshape(-1, 2)
+        if not cv2.isContourConvex(projected.astype(np.float32)):
+            return None
+        x1, y1 = projected.min(axis=0)
+        x2, y2 = projected.max(axis=0)
+        scale = np.sqrt(max(0.0, cv2.contourArea(projected)) / (size[0] * size[1]))
+        if not self.scale_range[0] <= scale <= self.scale_range[1]:
+            return None
+        return float(x1), float(y1), float(x2), float(y2), float(scale)
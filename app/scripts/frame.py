@@ -0,0 +1,121 @@
+from templates import MATCH_MODES, edge_map
+import weakref
+import numpy as np
+import cv2
+
+class Frame:
+    """
+    One captured BGR frame and the forms derived from it, each computed on first
+    use and kept for the life of the frame: gray, edges, channel planes, pyramid
+    levels, the integral image and region crops.
+
+    Crops are Frames over zero-copy views of the parent's buffer. A crop slices
+    its parent's gray or edge map when the parent already has one instead of
+    converting again. Parents hold their crops weakly and crops hold their
+    parent, so a frame and everything derived from it is freed together once the
+    last reference is dropped.
+    """
+    def __init__(self, bgr: np.ndarray, origin: tuple = (0, 0), parent: 'Frame' = None) -> None:
+        self.bgr: np.ndarray = bgr
+        self.origin: tuple = origin
+        self.parent: Frame = parent
+        self._cache: dict = {}
+        self._crops = weakref.WeakValueDictionary()
+
+    @classmethod
+    def wrap(cls, image) -> 'Frame':
+        return image if isinstance(image, Frame) else cls(image)
+
+    @property
+    def shape(self) -> tuple:
+        return self.bgr.shape
+
+    @property
+    def size(self) -> tuple:
+        return self.bgr.shape[1], self.bgr.shape[0]
+
+    def _from_parent(self, name: str) -> np.ndarray:
+        # Slice of the parent's memoized form, if the parent has computed it
+        if self.parent is None or name not in self.parent._cache:
+            return None
+        x, y = self.origin
+        height, width = self.bgr.shape[:2]
+        return self.parent._cache[name][y:y + height, x:x + width]
+
+    def _memo(self, name: str, compute, inherit: bool = True) -> np.ndarray:
+        value = self._cache.get(name)
+        if value is None:
+            value = self._from_parent(name) if inherit else None
+            if value is None:
+                value = compute()
+            self._cache[name] = value
+        return value
+
+    @property
+    def gray(self) -> np.ndarray:
+        return self._memo('gray', lambda: self.bgr if self.bgr.ndim == 2 else cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def edges(self) -> np.ndarray:
+        return self._memo('edges', lambda: edge_map(self.gray))
+
+    @property
+    def channels(self) -> tuple:
+        # Strided views, no copies
+        if self.bgr.ndim == 2:
+            return (self.bgr,)
+        return tuple(self.bgr[:, :, c] for c in range(self.bgr.shape[2]))
+
+    @property
+    def integral(self) -> np.ndarray:
+        """(H + 1) x (W + 1) summed-area table of gray."""
+        # Sums are not translation invariant, so crops build their own
+        return self._memo('integral', lambda: cv2.integral(self.gray), inherit=False)
+
+    def mean(self, region: tuple = None) -> float:
+        # Mean gray level of an (x, y, width, height) region in O(1) from the integral image
+        x, y, width, height = region or (0, 0, self.bgr.shape[1], self.bgr.shape[0])
+        table = self.integral
+        total = table[y + height, x + width] - table[y, x + width] - table[y + height, x] + table[y, x]
+        return float(total) / max(1, width * height)
+
+    def view(self, mode: str = 'color') -> np.ndarray:
+        """The image a template in this matching mode is matched against."""
+        if mode not in MATCH_MODES:
+            raise ValueError(f"Unknown match mode {mode!r}, expected one of {MATCH_MODES}.")
+        if mode == 'edge':
+            return self.edges
+        if mode == 'gray' or self.bgr.ndim == 2:
+            return self.gray
+        return self.bgr
+
+    def pyramid(self, level: int, mode: str = 'color') -> np.ndarray:
+        """view(mode) downsampled by 2**level, built from the next finer level."""
+        if level <= 0:
+            return self.view(mode)
+        key = ('pyramid', mode, level)
+        value = self._cache.get(key)
+        if value is None:
+            finer = self.pyramid(level - 1, mode)
+            value = cv2.resize(finer, (finer.shape[1] // 2, finer.shape[0] // 2), interpolation=cv2.INTER_AREA)
+            self._cache[key] = value
+        return value
+
+    def crop(self, region: tuple = None) -> 'Frame':
+        """Frame over an (x, y, width, height) region clipped to this frame; a view, no copy."""
+        if not region:
+            return self
+        x, y, width, height = (int(round(v)) for v in region)
+        frame_height, frame_width = self.bgr.shape[:2]
+        left, top = min(max(0, x), frame_width), min(max(0, y), frame_height)
+        right, bottom = min(frame_width, x + max(0, width)), min(frame_height, y + max(0, height))
+        key = (left, top, max(0, right - left), max(0, bottom - top))
+        crop = self._crops.get(key)
+        if crop is None:
+            crop = Frame(self.bgr[top:top + key[3], left:left + key[2]], origin=(left, top), parent=self)
+            self._crops[key] = crop
+        return crop
+
+    def release(self) -> None:
+        # Drops derived forms early, e.g. before handing a long-lived frame to a queue
+        self._cache.clear()
@@ -0,0 +1,169 @@
+"""
+Match coverage heatmaps: how often each screen cell fell inside a logged box.
+
+Boxes are accumulated into a 2D difference array (+1/-1 at the four corners of
+each box) and turned into coverage counts with two cumulative sums, so adding
+N boxes is O(N) and rendering is O(screen), independent of the history length.
+With a path the difference array is a memory-mapped file, so a heatmap keeps
+accumulating across runs however far the coordinate rings are trimmed.
+
+Log.record() keeps one such file per template next to its coordinate ring. Run
+from app/scripts to render every template in the coordinate log:
+
+    python heatmap.py --output ../logs/heatmaps
+"""
+import numpy as np
+import argparse
+import threading
+import re
+import os
+
+class Heatmap:
+    """
+    Coverage counts of boxes on a screen_size grid of cell x cell pixel cells.
+
+    With a path the file is laid out as an 8 x int64 header (magic, width,
+    height, cell, total, dropped, 0, 0) followed by the int32 difference array;
+    an existing file keeps the screen size and cell it was created with.
+    """
+    MAGIC = 0x48454154  # "HEAT"
+    HEADER_BYTES = 8 * 8
+
+    def __init__(self, screen_size: tuple = (2560, 1440), cell: int = 4, path: str = None) -> None:
+        self.path: str = path
+        header = None
+        if path is not None and os.path.exists(path):
+            header = np.memmap(path, dtype=np.int64, mode='r+', shape=(8,))
+            if header[0] != self.MAGIC:
+                raise ValueError(f"{path} is not a heatmap file.")
+            screen_size, cell = (int(header[1]), int(header[2])), int(header[3])
+
+        self.screen_size: tuple = tuple(screen_size)
+        self.cell: int = cell
+        self.shape: tuple = (-(-screen_size[1] // cell), -(-screen_size[0] // cell))
+        # One extra row and column take the closing corners of boxes that reach the edge
+        diff_shape = (self.shape[0] + 1, self.shape[1] + 1)
+        if path is None:
+            self._header = np.array([self.MAGIC, screen_size[0], screen_size[1], cell, 0, 0, 0, 0], dtype=np.int64)
+            self._diff = np.zeros(diff_shape, dtype=np.int32)
+        else:
+            if header is None:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                with open(path, mode='wb') as file:
+                    file.truncate(self.HEADER_BYTES + diff_shape[0] * diff_shape[1] * 4)
+                header = np.memmap(path, dtype=np.int64, mode='r+', shape=(8,))
+                header[:4] = (self.MAGIC, screen_size[0], screen_size[1], cell)
+                header.flush()
+            self._header = header
+            self._diff = np.memmap(path, dtype=np.int32, mode='r+', offset=self.HEADER_BYTES, shape=diff_shape)
+        self._counts = None
+        self._lock = threading.Lock()
+
+    @property
+    def total(self) -> int:
+        return int(self._header[4])
+
+    @property
+    def dropped(self) -> int:
+        return int(self._header[5])
+
+    def add(self, boxes) -> None:
+        """Adds [x1, y1, x2, y2] boxes in screen pixels; boxes fully off screen are counted as dropped."""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        if not len(boxes):
+            return
+        width, height = self.screen_size
+        x1 = np.clip(np.floor(boxes[:, 0] / self.cell), 0, self.shape[1]).astype(np.int64)
+        y1 = np.clip(np.floor(boxes[:, 1] / self.cell), 0, self.shape[0]).astype(np.int64)
+        x2 = np.clip(np.ceil(boxes[:, 2] / self.cell), 0, self.shape[1]).astype(np.int64)
+        y2 = np.clip(np.ceil(boxes[:, 3] / self.cell), 0, self.shape[0]).astype(np.int64)
+        valid = (x2 > x1) & (y2 > y1)
+        x1, y1, x2, y2 = x1[valid], y1[valid], x2[valid], y2[valid]
+
+        with self._lock:
+            np.add.at(self._diff, (y1, x1), 1)
+            np.add.at(self._diff, (y1, x2), -1)
+            np.add.at(self._diff, (y2, x1), -1)
+            np.add.at(self._diff, (y2, x2), 1)
+            self._counts = None
+            self._header[4] += int(valid.sum())
+            self._header[5] += int((~valid).sum())
+
+    def merge(self, other: 'Heatmap') -> None:
+        """Adds another heatmap's boxes; both must share the screen size and cell."""
+        if (other.screen_size, other.cell) != (self.screen_size, self.cell):
+            raise ValueError(f"Cannot merge a {other.screen_size} / {other.cell}px heatmap into a {self.screen_size} / {self.cell}px one.")
+        with self._lock:
+            self._diff += other._diff
+            self._counts = None
+            self._header[4:6] += other._header[4:6]
+
+    def counts(self) -> np.ndarray:
+        """(rows, cols) array of how many boxes covered each cell."""
+        with self._lock:
+            if self._counts is None:
+                self._counts = self._diff.cumsum(axis=0).cumsum(axis=1)[:self.shape[0], :self.shape[1]]
+            return self._counts
+
+    def clear(self) -> None:
+        with self._lock:
+            self._diff[:] = 0
+            self._counts = None
+            self._header[4:6] = 0
+
+    def flush(self) -> None:
+        if isinstance(self._diff, np.memmap):
+            self._header.flush()
+            self._diff.flush()
+
+    def render(self, path: str, region: list = None, title: str = None) -> str:
+        """Writes the heatmap as a PNG with the learned (x, y, width, height) region outlined; needs no display."""
+        # matplotlib costs more to import than everything else on the runtime path; only rendering needs it
+        from matplotlib.patches import Rectangle, Patch
+        from matplotlib.figure import Figure
+
+        width, height = self.screen_size
+        counts = self.counts()
+        figure = Figure(figsize=(12, 12 * height / width + 1))
+        ax = figure.add_subplot()
+        image = ax.imshow(np.ma.masked_equal(counts, 0), cmap='inferno', interpolation='nearest',
+                          extent=(0, self.shape[1] * self.cell, self.shape[0] * self.cell, 0))
+        figure.colorbar(image, ax=ax, label='Boxes covering cell', fraction=0.03)
+
+        handles = [Patch(color='orange', label=f'Hit coverage ({self.total} boxes)')]
+        if region:
+            x, y, region_width, region_height = region
+            ax.add_patch(Rectangle((x, y), region_width, region_height, linewidth=2, edgecolor='cyan', facecolor='none'))
+            handles.append(Patch(edgecolor='cyan', facecolor='none', label='Learned region'))
+        ax.legend(handles=handles, loc='upper right')
+
+        ax.set_title(title or "Hit Coverage")
+        ax.set_xlabel("Screen Width")
+        ax.set_ylabel("Screen Height")
+        ax.set_xlim(0, width)
+        ax.set_ylim(height, 0)
+        ax.set_facecolor('black')
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        figure.savefig(path, dpi=100)
+        return path
+
+def heatmap_path(directory: str, template: str) -> str:
+    # One PNG per template, named after the image; '' is the legacy untagged log
+    name = os.path.splitext(os.path.basename(template))[0] if template else 'all'
+    return os.path.join(directory, re.sub(r'[^A-Za-z0-9_.-]+', '_', name) + '_heatmap.png')
+
+if __name__ == "__main__":
+    from optimizer import Log
+
+    parser = argparse.ArgumentParser(description="Render per-template hit heatmaps from the coordinate log.")
+    parser.add_argument("--output", default="../logs/heatmaps")
+    parser.add_argument("--templates", nargs="+", default=None, help="Only render these templates.")
+    parser.add_argument("--screen", type=int, nargs=2, default=[2560, 1440], metavar=("WIDTH", "HEIGHT"),
+                        help="Screen size of heatmaps not yet on disk.")
+    parser.add_argument("--cell", type=int, default=4, help="Cell size in pixels of heatmaps not yet on disk.")
+    args = parser.parse_args()
+
+    log = Log(heatmap_size=tuple(args.screen), heatmap_cell=args.cell)
+    for path in log.render_heatmaps(args.output, templates=args.templates):
+        print(f"    {path}")
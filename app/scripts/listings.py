@@ -0,0 +1,153 @@
+from ocr import dhash, hamming
+import threading
+import sqlite3
+import time
+import re
+import os
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    id         INTEGER PRIMARY KEY,
+    text_key   TEXT,
+    phash      INTEGER NOT NULL,
+    band0      INTEGER NOT NULL,
+    band1      INTEGER NOT NULL,
+    band2      INTEGER NOT NULL,
+    band3      INTEGER NOT NULL,
+    title      TEXT,
+    company    TEXT,
+    status     TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen  REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS listings_text ON listings (text_key) WHERE text_key IS NOT NULL;
+CREATE INDEX IF NOT EXISTS listings_band0 ON listings (band0);
+CREATE INDEX IF NOT EXISTS listings_band1 ON listings (band1);
+CREATE INDEX IF NOT EXISTS listings_band2 ON listings (band2);
+CREATE INDEX IF NOT EXISTS listings_band3 ON listings (band3);
+CREATE INDEX IF NOT EXISTS listings_last_seen ON listings (last_seen);
+"""
+
+def text_key(title: str, company: str) -> str:
+    # Case, punctuation and OCR spacing noise do not make a new listing
+    normalize = lambda text: re.sub(r'[^a-z0-9]+', ' ', (text or '').lower()).strip()
+    title, company = normalize(title), normalize(company)
+    return f"{title}|{company}" if title else None
+
+def bands(phash: int) -> tuple:
+    # Four 16-bit slices: hashes within 3 bits of each other share at least one
+    return tuple((phash >> shift) & 0xFFFF for shift in (0, 16, 32, 48))
+
+def signed(phash: int) -> int:
+    # SQLite integers are signed 64-bit
+    return phash - (1 << 64) if phash >= 1 << 63 else phash
+
+def parse_card(text: str) -> tuple:
+    """(title, company) from a listing card's OCR text: its first two non-empty lines."""
+    lines = [line.strip() for line in (text or '').splitlines() if line.strip()]
+    return (lines[0] if lines else None), (lines[1] if len(lines) > 1 else None)
+
+class ListingIndex:
+    """
+    SQLite index of listings that were already opened or applied to.
+
+    Listings are keyed by their OCR'd title and company when available and by a
+    64-bit dHash of the listing card otherwise; near-duplicate hashes (within
+    max_distance bits) are found through indexed 16-bit bands instead of a
+    table scan. A text match also needs the hashes to be within text_distance
+    bits, so cards whose OCR picked up the same wrong lines stay apart. Entries
+    older than expiry_days are ignored and purged.
+    """
+    def __init__(self, path: str = '../config/listings.db', expiry_days: float = 30.0, max_distance: int = 3,
+                 text_distance: int = 10) -> None:
+        self.path: str = path
+        self.expiry: float = expiry_days * 86400
+        self.max_distance: int = max_distance
+        self.text_distance: int = text_distance
+        self._lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self.purge()
+
+    def fingerprint(self, card) -> int:
+        # Accepts arrays or Frames (hashed on their grayscale view)
+        return dhash(getattr(card, 'gray', card), size=8)
+
+    def _cutoff(self) -> float:
+        return time.time() - self.expiry
+
+    def lookup(self, phash: int = None, title: str = None, company: str = None) -> dict:
+        """The unexpired entry for this listing, or None."""
+        key = text_key(title, company)
+        columns = "id, phash, title, company, status, first_seen, last_seen"
+        with self._lock:
+            if key:
+                row = self._db.execute(
+                    f"SELECT {columns} FROM listings WHERE text_key = ? AND last_seen >= ?", (key, self._cutoff())
+                ).fetchone()
+                if row and (phash is None or hamming(row[1] & (2**64 - 1), phash) <= self.text_distance):
+                    return self._entry(row)
+            if phash is None:
+                return None
+            b0, b1, b2, b3 = bands(phash)
+            rows = self._db.execute(
+                f"SELECT {columns} FROM listings WHERE (band0 = ? OR band1 = ? OR band2 = ? OR band3 = ?) AND last_seen >= ?",
+                (b0, b1, b2, b3, self._cutoff())
+            ).fetchall()
+        for row in rows:
+            if hamming(row[1] & (2**64 - 1), phash) <= self.max_distance:
+                # With text on both sides, a different title or company is a different listing
+                if key and row[2] and text_key(row[2], row[3]) != key:
+                    continue
+                return self._entry(row)
+        return None
+
+    def _entry(self, row: tuple) -> dict:
+        return dict(zip(("id", "phash", "title", "company", "status", "first_seen", "last_seen"), row))
+
+    def seen(self, card=None, title: str = None, company: str = None) -> bool:
+        phash = self.fingerprint(card) if card is not None else None
+        return self.lookup(phash, title, company) is not None
+
+    def mark(self, card=None, title: str = None, company: str = None, status: str = 'opened', phash: int = None) -> None:
+        """Records (or refreshes) a listing with its latest status."""
+        if phash is None:
+            phash = self.fingerprint(card)
+        now = time.time()
+        key = text_key(title, company)
+        existing = self.lookup(phash, title, company)
+        with self._lock, self._db:
+            # Expired rows are invisible to lookup() but still hold their text key
+            self._db.execute("DELETE FROM listings WHERE last_seen < ?", (self._cutoff(),))
+            if key is not None:
+                holder = self._db.execute("SELECT id FROM listings WHERE text_key = ?", (key,)).fetchone()
+                # Text shared by cards that look different identifies neither of them
+                if holder and (existing is None or holder[0] != existing["id"]):
+                    key = None
+            if existing:
+                self._db.execute(
+                    "UPDATE listings SET status = ?, last_seen = ?, title = COALESCE(?, title), company = COALESCE(?, company), "
+                    "text_key = COALESCE(?, text_key) WHERE id = ?",
+                    (status, now, title, company, key, existing["id"])
+                )
+            else:
+                self._db.execute(
+                    "INSERT INTO listings (text_key, phash, band0, band1, band2, band3, title, company, status, first_seen, last_seen) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, signed(phash), *bands(phash), title, company, status, now, now)
+                )
+
+    def purge(self) -> int:
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM listings WHERE last_seen < ?", (self._cutoff(),)).rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -1,121 +1,132 @@
-from PIL import Image, ImageOps
+from concurrent.futures import ThreadPoolExecutor
+from matching import Templates, single_scaling, find_all_matches_color, multi_scale_peaks
+from frame import Frame
+from changes import ChangeDetector, MatchCache
+from features import FeatureIndex
 from optimizer import Log
+from capture import save_frame
+from artifacts import ArtifactWriter
+from waits import default_capture, fingerprint, wait_until_stable, wait_until_changed, wait_until_visible, wait_until_gone
+from ocr import OCRReader, PageClassifier
+from listings import ListingIndex, parse_card
+from scanner import ListingScanner
+from tracing import Tracer
+from pipeline import Pipeline
+from roi import AdaptiveROI
+from profiles import Profiles, load_defaults
 import numpy as np
-import pytesseract
-import pyautogui
 import time
-import cv2
-import csv
 import os
 import shutil
 
-Log = Log()
-screen_width = 2560
-screen_height = 1440
-
-def single_scaling(screenshot_gray, target_image, threshold=.75):
-    result = cv2.matchTemplate(screenshot_gray, target_image, cv2.TM_CCOEFF_NORMED)
-    min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-
-    if max_val >= threshold:
-        h, w = target_image.shape
-        top_left = min_loc
-        bottom_right = (top_left[0] + w, top_left[1] + h)
-        return top_left, bottom_right, 1.0, max_val  # Return scale as 1.0
-    else:
+Log = Log(deferred=True)
+DEFAULTS = load_defaults()
+Profiles = Profiles()
+ROI = AdaptiveROI(source=Log.region)
+Artifacts = ArtifactWriter(directory='../logs')
+# Paragraph tiles are recognized in parallel with tesserocr; pytesseract reads each page whole
+OCR = OCRReader(tiles='paragraphs')
+
+PAGE_KEYWORDS = {
+    'contact': ['contact info', 'email address', 'phone country code', 'mobile phone number'],
+    'resume': ['be sure to include an updated resume'],
+    'additional': ['how many years of work experience do you have with'],
+    'review': ['review your application', 'the employer will also receive a copy of your profile']
+}
+Pages = PageClassifier(PAGE_KEYWORDS)
+
+# Full-frame listing scans are split into tiles across every core
+TILE_WORKERS = os.cpu_count() or 1
+
+# Where a listing card sits relative to its 'Easy Apply' label's center as (x, y, width, height)
+LISTING_CARD = (-440, -110, 520, 130)
+
+# Incremental searches only re-match the blocks that changed since the last frame
+Changes = ChangeDetector()
+Matches = MatchCache()
+
+# ORB descriptors of every template used with detector='features', matched in one pass per frame
+Features = FeatureIndex()
+
+def match_template(frame, template, get_all_matches: bool = False, match_threshold: float = 0.75,
+                   max_results: int = None, scales: tuple = (1.0,), pyramid_levels: int = 0,
+                   match_mode: str = 'color', tile_workers: int = None) -> any:
+    # Pure matching step, safe to run on worker threads (OpenCV releases the GIL)
+    with Tracer.span('matchTemplate', template=getattr(template, 'path', None), mode=match_mode):
+        if get_all_matches:
+            return find_all_matches_color(frame, template, threshold=match_threshold, max_results=max_results,
+                                          scales=scales, pyramid_levels=pyramid_levels, mode=match_mode,
+                                          workers=tile_workers)
+        return single_scaling(frame, template, threshold=match_threshold, scales=scales, pyramid_levels=pyramid_levels,
+                              mode=match_mode, workers=tile_workers)
+
+def match_changed(frame, template, opts: dict, changes: tuple, key: tuple) -> any:
+    # Like match_template, but reuses the last result outside the dirty rectangles.
+    # The cache holds every peak, uncapped: when the best one goes away, the runner-up
+    # in an unchanged block must still be there to take its place.
+    width, height = template.size
+    template_size = (int(np.ceil(width * max(opts['scales']))), int(np.ceil(height * max(opts['scales']))))
+    key = (template.path, key, opts['match_threshold'], tuple(opts['scales']), opts['pyramid_levels'], opts['match_mode'])
+
+    def match(image):
+        with Tracer.span('matchTemplate', template=template.path, mode=opts['match_mode'], size=image.size):
+            return multi_scale_peaks(image, template, opts['match_threshold'], scales=opts['scales'],
+                                     pyramid_levels=opts['pyramid_levels'], mode=opts['match_mode'],
+                                     workers=opts['tile_workers'])
+
+    with Tracer.span('match_changed', template=template.path, dirty=-1 if changes[1] is None else len(changes[1])):
+        peaks = Matches.search(key, frame, changes, template_size, match)
+    return peak_result(peaks, opts['get_all_matches'], opts['max_results'])
+
+def peak_result(peaks, get_all_matches: bool, max_results: int = None) -> any:
+    # (N, 6) [x1, y1, x2, y2, score, scale] peaks in the shape match_template returns
+    if get_all_matches:
+        return peaks[:max_results, :5]
+    if not len(peaks):
         return None, None, None, None
-
-def find_all_matches_color(screenshot_rgb, target_rgb, threshold):
-    # Perform template matching on each channel separately and average results
-    screenshot_b, screenshot_g, screenshot_r = cv2.split(screenshot_rgb)
-    target_b, target_g, target_r = cv2.split(target_rgb)
-
-    result_b = cv2.matchTemplate(screenshot_b, target_b, cv2.TM_CCOEFF_NORMED)
-    result_g = cv2.matchTemplate(screenshot_g, target_g, cv2.TM_CCOEFF_NORMED)
-    result_r = cv2.matchTemplate(screenshot_r, target_r, cv2.TM_CCOEFF_NORMED)
-
-    # Average the results across channels
-    result_combined = (result_b + result_g + result_r) / 3
-
-    # Find all matches above the threshold
-    locations = np.where(result_combined >= threshold)
-    matches = []
-    h, w = target_rgb.shape[:2]
-    for pt in zip(*locations[::-1]):
-        top_left = (pt[0], pt[1])
-        bottom_right = (top_left[0] + w, top_left[1] + h)
-        matches.append((top_left, bottom_right))
-
-    return matches
-
-def analyze(target_img_path: str    = '../images/EasyApply.png',
-            coord_logs_path: str    = '../config/coordinate_log.csv',
-            screenshot_path: str    = '../logs/analyzed_region.png',
-            get_all_matches: bool   = False,
-            optimize_region: tuple  = None,
-            restrict_region: tuple  = None,
-            limit_optimizer: int    = 20,
-            match_threshold: float  = 0.75,
-            visual_debugger: bool   = False
-            ):
-
-    # Take Screenshot
-    screenshot = pyautogui.screenshot(region=restrict_region) if restrict_region else pyautogui.screenshot()
-    screenshot.save(screenshot_path)
-
-    # Crop screenshot if optimize_region is provided
-    if optimize_region:
-        x, y, width, height = optimize_region
-        screenshot = screenshot.crop((x, y, x + width, y + height))
-
-    # Convert screenshot to RGB (discard the alpha channel if present)
-    screenshot_rgb = np.array(screenshot.convert("RGB"))
-
-    # Load the target image (in color)
-    target_image = cv2.imread(target_img_path)
-    if target_image is None:
-        print(f"Target image {target_img_path} not found!")
-        return None
+    x1, y1, x2, y2, score, scale = peaks[0]
+    return (int(x1), int(y1)), (int(x2), int(y2)), float(scale), float(score)
+
+def report(screenshot,
+           matches,
+           target_img_path: str    = '../images/EasyApply.png',
+           screenshot_path: str    = '../logs/analyzed_region.png',
+           get_all_matches: bool   = False,
+           optimize_region: tuple  = None,
+           restrict_region: tuple  = None,
+           limit_optimizer: int    = 20,
+           visual_debugger: bool   = False
+           ):
 
     # Handle get_all_matches logic
     if get_all_matches:
-        matches = find_all_matches_color(screenshot_rgb, target_image, threshold=match_threshold)
-        if matches:
-            match_centers = []  # Store center coordinates of all matches
-            match_coords = []   # Store top-left and bottom-right coordinates of all matches
-
-            for top_left, bottom_right in matches:
-                match_coords.append((top_left, bottom_right))
-
-                # Calculate the center of the current match
-                center_x = top_left[0] + (bottom_right[0] - top_left[0]) // 2
-                center_y = top_left[1] + (bottom_right[1] - top_left[1]) // 2
-                match_centers.append([int(center_x), int(center_y)])
-
-            # Calculate the maximum bounding box that encapsulates all matches
-            max_top_left, max_bottom_right = Log.encapsulate(match_coords)
+        if matches is not None and len(matches):
+            # One scored box per object, best match first
+            boxes = matches[:, :4].astype(int)
+            match_centers = np.column_stack((
+                boxes[:, 0] + (boxes[:, 2] - boxes[:, 0]) // 2,
+                boxes[:, 1] + (boxes[:, 3] - boxes[:, 1]) // 2
+            )).tolist()
 
             if visual_debugger:
-                # Save the cropped screenshot for the entire bounding box
-                cropped_screenshot = screenshot.crop((max_top_left[0], max_top_left[1], max_bottom_right[0], max_bottom_right[1]))
-                cropped_screenshot.save(f"../logs/all_image_matches.png")
-                print(f"Visual debug: Saved all matches as 'all_image_matches.png'.")
-
-            # Adjust to Screen Size
-            if optimize_region:
-                max_top_left = (max_top_left[0] + optimize_region[0], max_top_left[1] + optimize_region[1])
-                max_bottom_right = (max_bottom_right[0] + optimize_region[0], max_bottom_right[1] + optimize_region[1])
+                # Save the cropped screenshot for the area spanning every match
+                left, top = boxes[:, :2].min(axis=0).clip(0)
+                right, bottom = boxes[:, 2:].max(axis=0)
+                Artifacts.submit("all_image_matches.png", screenshot[top:bottom, left:right])
+                print(f"Visual debug: Queued all matches as 'all_image_matches.png'.")
 
-            # Log only the encapsulating bounding box
-            with open(coord_logs_path, mode='a', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow([max_top_left, max_bottom_right])
+            # Log every object separately: a box around several listings is not where any of them is
+            offset_x, offset_y = (optimize_region[0], optimize_region[1]) if optimize_region else (0, 0)
+            for x1, y1, x2, y2 in boxes.tolist():
+                Log.record(target_img_path, (x1 + offset_x, y1 + offset_y), (x2 + offset_x, y2 + offset_y))
 
-            print(f"Encapsulating bounding box of {len(match_coords)} matches logged to {coord_logs_path}.")
+            print(f"Bounding boxes of {len(boxes)} matches logged.")
 
-            # Limit the number of log entries in the CSV file
-            Log.limit(max_entries=limit_optimizer)
+            # Limit the number of log entries for this template
+            Log.limit(max_entries=limit_optimizer, template=target_img_path)
 
+            if optimize_region:
+                match_centers = [[coords[0]+optimize_region[0], coords[1]+optimize_region[1]] for coords in match_centers]
             if restrict_region:
                 match_centers = [[coords[0]+restrict_region[0], coords[1]] for coords in match_centers]
             return match_centers  # Return list of center coordinates
@@ -124,13 +135,13 @@ def analyze(target_img_path: str    = '../images/EasyApply.png',
             return None
     else:
         # Single match: Use the first found match
-        top_left, bottom_right, best_scale, best_val = single_scaling(screenshot_rgb, target_image, threshold=match_threshold)
+        top_left, bottom_right, best_scale, best_val = matches
 
         if top_left is not None:
-            cropped_screenshot = screenshot.crop((top_left[0], top_left[1], bottom_right[0], bottom_right[1]))
+            cropped_screenshot = screenshot[top_left[1]:bottom_right[1], top_left[0]:bottom_right[0]]
 
-            # Save the cropped screenshot
-            cropped_screenshot.save(f"../logs/single_image_match.png")
+            # Save the cropped screenshot off the hot path
+            Artifacts.submit("single_image_match.png", cropped_screenshot)
 
             h, w = bottom_right[1] - top_left[1], bottom_right[0] - top_left[0]
 
@@ -140,14 +151,12 @@ def analyze(target_img_path: str    = '../images/EasyApply.png',
                 bottom_right = (bottom_right[0] + optimize_region[0], bottom_right[1] + optimize_region[1])
 
             # Log Coordinates
-            with open(coord_logs_path, mode='a', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow([top_left, bottom_right])
+            Log.record(target_img_path, top_left, bottom_right)
 
-            print(f"Match found with confidence {best_val}. Coordinates logged to {coord_logs_path}.")
+            print(f"Match found with confidence {best_val}. Coordinates logged.")
 
             # Log Limiter
-            Log.limit(max_entries=limit_optimizer)
+            Log.limit(max_entries=limit_optimizer, template=target_img_path)
 
             # Return the center coordinate of the single match
             center_x = top_left[0] + (bottom_right[0] - top_left[0]) // 2
@@ -155,100 +164,395 @@ def analyze(target_img_path: str    = '../images/EasyApply.png',
             return center_x, center_y
         else:
             # If no match is found, still save the screenshot with a "no_match" suffix
-            no_match_screenshot_path = screenshot_path.replace(".png", "_no_match.png")
-            screenshot.save(no_match_screenshot_path)
-            print(f"No match found. Screenshot saved to {no_match_screenshot_path}")
+            no_match_screenshot_path = Artifacts.submit(os.path.basename(screenshot_path).replace(".png", "_no_match.png"), screenshot)
+            print(f"No match found. Screenshot queued to {no_match_screenshot_path}")
 
             return None
 
+def capture(restrict_region: tuple = None, screenshot_path: str = None, save_screenshot: bool = False) -> np.ndarray:
+    # Take Screenshot as a contiguous BGR array; encoding it to disk is opt-in
+    with Tracer.span('capture'):
+        screenshot = default_capture().grab(restrict_region)
+    if save_screenshot and screenshot_path:
+        with Tracer.span('save_screenshot'):
+            save_frame(screenshot_path, screenshot)
+    return screenshot
+
+def prepare(screenshot, optimize_region: tuple = None) -> Frame:
+    # Crop screenshot if optimize_region is provided (a view, no copy); its gray,
+    # edge and pyramid forms are made once and shared by every template
+    return Frame.wrap(screenshot).crop(optimize_region)
+
+def region_key(region, screenshot) -> tuple:
+    # Search regions are whole pixels clipped to the frame so offsets and crops agree
+    if not region:
+        return None
+    x, y, width, height = (int(round(v)) for v in region)
+    frame_height, frame_width = screenshot.shape[:2]
+    left, top = max(0, x), max(0, y)
+    right, bottom = min(frame_width, x + width), min(frame_height, y + height)
+    return left, top, max(0, right - left), max(0, bottom - top)
 
-def scroll(y_scroll: int=0) -> None:
-    pyautogui.scroll(y_scroll, x=None, y=None)
+def analyze(target_img_path: str    = '../images/EasyApply.png',
+            screenshot_path: str    = '../logs/analyzed_region.png',
+            get_all_matches: bool   = False,
+            optimize_region: tuple  = None,
+            restrict_region: tuple  = None,
+            adaptive_roi: bool      = False,
+            limit_optimizer: int    = None,
+            match_threshold: float  = None,
+            max_results: int        = None,
+            scales: tuple           = (1.0,),
+            pyramid_levels: int     = 0,
+            match_mode: str         = 'color',
+            tile_workers: int       = None,
+            incremental: bool       = False,
+            detector: str           = 'template',
+            visual_debugger: bool   = False,
+            save_screenshot: bool   = False,
+            frame: np.ndarray       = None
+            ):
 
-def main():
-    current_time: str = time.strftime("%H:%M:%S")
-    i: int = 0
-    print(f"[ Starting @ {time.strftime("%Y-%m-%d")} ]")
-    while True:
-        i += 1
-        # Get the current time and format it
-        print(f"\n[ {i} | {current_time} ]")
+    return analyze_many([target_img_path],
+                        screenshot_path=screenshot_path,
+                        get_all_matches=get_all_matches,
+                        optimize_region=optimize_region,
+                        restrict_region=restrict_region,
+                        adaptive_roi=adaptive_roi,
+                        limit_optimizer=limit_optimizer,
+                        match_threshold=match_threshold,
+                        max_results=max_results,
+                        scales=scales,
+                        pyramid_levels=pyramid_levels,
+                        match_mode=match_mode,
+                        tile_workers=tile_workers,
+                        incremental=incremental,
+                        detector=detector,
+                        visual_debugger=visual_debugger,
+                        save_screenshot=save_screenshot,
+                        frame=frame)[target_img_path]
+
+def found(matches, get_all_matches: bool) -> bool:
+    if get_all_matches:
+        return matches is not None and len(matches) > 0
+    return matches[0] is not None
+
+def profiled(path: str, opts: dict, restrict_region: tuple = None) -> dict:
+    # Calibrated settings for path; the calibrated region is in screen coordinates
+    profile = Profiles.get(path)
+    if not profile:
+        return {}
+    settings = {key: profile[key] for key in ('match_threshold', 'match_mode', 'pyramid_levels') if key in profile}
+    region = profile.get('optimize_region')
+    if region and not opts['optimize_region'] and not opts['adaptive_roi']:
+        offset_x, offset_y = (restrict_region[0], restrict_region[1]) if restrict_region else (0, 0)
+        settings['optimize_region'] = (region[0] - offset_x, region[1] - offset_y, region[2], region[3])
+        settings['profiled_region'] = True
+    return settings
+
+def search(screenshot, template, opts: dict, prepared: dict, dirty: dict = None, detected: dict = None) -> tuple:
+    # Feature detections were made for every template at once, before the searches
+    if opts['detector'] == 'features':
+        region = region_key(opts['optimize_region'], screenshot)
+        return peak_result(detected[region][template.path], opts['get_all_matches'], opts['max_results']), region, prepared[region]
+
+    # Non-adaptive searches use the crops prepared up front on the calling thread
+    if not opts['adaptive_roi'] or opts['optimize_region']:
+        region = region_key(opts['optimize_region'], screenshot)
+        if opts['incremental']:
+            stream, changes = dirty[region]
+            matches = match_changed(prepared[region], template, opts, changes, stream)
+        else:
+            matches = match_template(prepared[region], template, opts['get_all_matches'],
+                                     opts['match_threshold'], opts['max_results'], opts['scales'], opts['pyramid_levels'],
+                                     opts['match_mode'], opts['tile_workers'])
+        if found(matches, opts['get_all_matches']) or not opts.get('profiled_region'):
+            return matches, region, prepared[region]
+
+        # A calibrated region that misses (window moved, layout changed) falls back to the whole frame
+        return match_template(screenshot, template, opts['get_all_matches'],
+                              opts['match_threshold'], opts['max_results'], opts['scales'], opts['pyramid_levels'],
+                              opts['match_mode'], opts['tile_workers']), None, screenshot
+
+    # Adaptive ROI: learned region first, widened on a miss, full frame last
+    frame_size = screenshot.shape[1::-1]
+    candidates = ROI.candidates(template.path, frame_size, padding=template.size)
+    for step, region in enumerate(candidates):
+        cropped = prepared[region] if region in prepared else prepare(screenshot, region)
+        matches = match_template(cropped, template, opts['get_all_matches'],
+                                 opts['match_threshold'], opts['max_results'], opts['scales'], opts['pyramid_levels'],
+                                 opts['match_mode'], opts['tile_workers'])
+        if not found(matches, opts['get_all_matches']):
+            continue
+        boxes = matches[:, :4] if opts['get_all_matches'] else [matches[0] + matches[1]]
+        if ROI.on_border(boxes, region, frame_size):
+            continue
+        ROI.record(template.path, hit=(step == 0 and region is not None))
+        break
+    return matches, region, cropped
+
+def analyze_many(templates,
+                 screenshot_path: str    = '../logs/analyzed_region.png',
+                 get_all_matches: bool   = False,
+                 optimize_region: tuple  = None,
+                 restrict_region: tuple  = None,
+                 adaptive_roi: bool      = False,
+                 limit_optimizer: int    = None,
+                 match_threshold: float  = None,
+                 max_results: int        = None,
+                 scales: tuple           = (1.0,),
+                 pyramid_levels: int     = 0,
+                 match_mode: str         = 'color',
+                 tile_workers: int       = None,
+                 incremental: bool       = False,
+                 detector: str           = 'template',
+                 visual_debugger: bool   = False,
+                 save_screenshot: bool   = False,
+                 max_workers: int        = None,
+                 frame: np.ndarray       = None
+                 ) -> dict:
+    """
+    Captures one frame and matches every template against it.
+
+    templates is either a list of template paths or a dict mapping each path to
+    per-template overrides (get_all_matches, match_threshold, max_results, scales,
+    pyramid_levels, match_mode, tile_workers, optimize_region, adaptive_roi, incremental, detector,
+    visual_debugger).
+    Templates calibrated in ../config/profiles.json take their threshold, mode,
+    pyramid level and search region from the profile over the call's defaults;
+    override dicts still win. match_threshold and limit_optimizer default to
+    ../config/config.json.
+    match_mode is 'color' (all channels, one matchTemplate call), 'gray' or 'edge'.
+    tile_workers > 1 splits each search into that many overlapping tiles matched in parallel.
+    incremental searches compare the frame with the previous one for the same
+    restrict_region and search region, keep the last matches in unchanged blocks and
+    re-match only the changed rectangles; adaptive_roi searches always match in full.
+    detector='features' finds the template by ORB descriptors and a homography
+    instead of correlation: at any scale and, through edge maps, in either theme.
+    All such templates sharing a search region are found in one pass; thresholds,
+    scales, modes and adaptive_roi do not apply to them.
+    Pass frame to match an already captured screenshot of restrict_region instead.
+    Returns {template path: analyze()-style result}.
+    """
+    if not isinstance(templates, dict):
+        templates = {path: {} for path in templates}
+    match_threshold = DEFAULTS['match_threshold'] if match_threshold is None else match_threshold
+    limit_optimizer = DEFAULTS['limit_optimizer'] if limit_optimizer is None else limit_optimizer
+
+    defaults = {
+        'get_all_matches': get_all_matches,
+        'optimize_region': optimize_region,
+        'adaptive_roi': adaptive_roi,
+        'match_threshold': match_threshold,
+        'max_results': max_results,
+        'scales': scales,
+        'pyramid_levels': pyramid_levels,
+        'match_mode': match_mode,
+        'tile_workers': tile_workers,
+        'incremental': incremental,
+        'detector': detector,
+        'visual_debugger': visual_debugger
+    }
+    options = {
+        path: {**defaults, **profiled(path, {**defaults, **(overrides or {})}, restrict_region), **(overrides or {})}
+        for path, overrides in templates.items()
+    }
+
+    # One capture per call; crops and their mode conversions are shared by every template
+    screenshot = Frame.wrap(frame if frame is not None else capture(restrict_region, screenshot_path, save_screenshot))
+    prepared = {}
+    dirty = {}
+    featured = {}
+    for path, opts in options.items():
+        region = region_key(opts['optimize_region'], screenshot)
+        if opts['detector'] == 'features':
+            if region not in prepared:
+                prepared[region] = prepare(screenshot, region)
+            featured.setdefault(region, []).append(path)
+        elif not (opts['adaptive_roi'] and region is None):
+            if region not in prepared:
+                prepared[region] = prepare(screenshot, region)
+            prepared[region].view(opts['match_mode'])
+            # Diffed once per search region, however many templates share it
+            if opts['incremental'] and region not in dirty:
+                stream = (restrict_region, region)
+                with Tracer.span('changes'):
+                    dirty[region] = stream, Changes.update(prepared[region], key=stream)
+
+    results = {}
+    jobs = {}
+    for path, opts in options.items():
+        with Tracer.span('template.load'):
+            template = Templates.get(path)
+        if template is None:
+            print(f"Target image {path} not found!")
+            results[path] = None
+            continue
+        jobs[path] = template
+
+    # One descriptor extraction and kNN query per region serves every feature template in it
+    detected = {}
+    for region, paths in featured.items():
+        with Tracer.span('features', templates=len(paths)):
+            detected[region] = Features.detect(prepared[region], [path for path in paths if path in jobs])
+
+    # Independent matchTemplate calls run concurrently
+    def run(path):
+        return search(screenshot, jobs[path], options[path], prepared, dirty, detected)
+
+    with Tracer.span('match', templates=len(jobs)):
+        if len(jobs) == 1:
+            matched = {path: run(path) for path in jobs}
+        elif max_workers:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                matched = dict(zip(jobs, executor.map(run, jobs)))
+        else:
+            matched = dict(zip(jobs, _match_executor().map(run, jobs)))
+
+    # Logging and debug output stay on the calling thread
+    for path, (matches, region, cropped) in matched.items():
+        opts = options[path]
+        with Tracer.span('report', template=path):
+            results[path] = report(cropped.bgr, matches,
+                                   target_img_path=path,
+                                   screenshot_path=screenshot_path,
+                                   get_all_matches=opts['get_all_matches'],
+                                   optimize_region=region,
+                                   restrict_region=restrict_region,
+                                   limit_optimizer=limit_optimizer,
+                                   visual_debugger=opts['visual_debugger'])
+
+        # Relearn regions that keep missing from the newest log entries
+        if opts['adaptive_roi'] and ROI.needs_relearn(path):
+            ROI.learn(path, Log.reset(path))
+    return results
+
+_executor = None
+
+def _match_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1))
+    return _executor
+
+
+def gui() -> any:
+    # pyautogui is only imported once input is actually sent
+    import pyautogui
+    return pyautogui
+
+def scroll(y_scroll: int=0, x: int=None, y: int=None) -> None:
+    gui().scroll(y_scroll, x=x, y=y)
+
+def main(interval: float = 5.0, timeout: float = None):
+    print(f"[ Starting @ {time.strftime('%Y-%m-%d')} ]")
 
-        # Analyze Match and save a screenshot each time
-        coordinates: list = analyze(
+    # Analyze Match on the pipeline's match thread while the next frame is captured
+    def match(frame) -> list:
+        return analyze(
             target_img_path='../images/EasyApplySmall.png',
             get_all_matches=True,
-            visual_debugger=True
+            tile_workers=TILE_WORKERS,
+            # Idle polls diff the frame and reuse the last matches
+            incremental=True,
+            visual_debugger=True,
+            frame=frame
         )
 
-        # Optional: Screening Optimization
-        Log.optimize()
+    def act(frame, coordinates: list) -> None:
+        # Get the current time and format it
+        print(f"\n[ {pipeline.acted + 1} | {time.strftime('%H:%M:%S')} ] {coordinates}")
+
+        # Screening Optimization: the learned region updates with every logged match
+        print(f"    Learned region: {Log.region()}")
 
-        # click(coordinates[0], coordinates[1]) if coordinates else None
+        # if coordinates:
+        #     gui().click(coordinates[0][0], coordinates[0][1])
+        #     pipeline.invalidate()
 
-        # Iteration Interval
-        time.sleep(5)
+    # Iteration Interval paces capture; config and debug writes happen on their own threads
+    pipeline = Pipeline(capture=capture, match=match, act=act, interval=interval)
+    try:
+        pipeline.run(timeout=timeout)
+    finally:
+        Log.flush()
+        print(f"    Pipeline: {pipeline.stats()}")
 
 def automation_series() -> None:
     # LOCAL FUNCTIONS _______________________________________________
 
     def scan():
-         pass
+        # Streams listings: the first screen, then only the strip each scroll exposes
+        anchor: dict = {}
+        scanner = ListingScanner(
+            '../images/EasyApplySmall.png',
+            capture=default_capture().grab,
+            # Scroll over the list itself, not wherever the last click left the mouse
+            scroll=lambda step: scroll(step, anchor.get('x'), anchor.get('y')),
+            settle=lambda: wait_until_stable(timeout=2),
+            workers=TILE_WORKERS
+        )
+        for x, y, frame in scanner.scan():
+            anchor.update(x=x, y=y)
+            yield x, y, frame
 
-    def screenie(region: tuple = None) -> any:
+    def screenie(frame: Frame, region: tuple = None, save: bool = False) -> Frame:
+        # Region of an already captured frame: a view, not another capture
         print(f"    Capturing region: {region}")
-        try:
-            image = pyautogui.screenshot(region=region) if region else pyautogui.screenshot()
-            image.save("../logs/analyzed_region.png")
-            return image
-        except Exception as e:
-            print(f"Error taking screenshot: {e}")
-            return None
-
-    def click(clicks: int = 1, x: int = 0, y: int = 0, wait: int = 0) -> None:
-        for _ in range(clicks):
-            pyautogui.click(x, y)
-        time.sleep(wait)
+        image = frame.crop(region)
+        if save:
+            Artifacts.submit("analyzed_region.png", image.bgr)
+        return image
+
+    def click(clicks: int = 1, x: int = 0, y: int = 0, wait: int = 0) -> bool:
+        # Snapshot first so the wait can tell the click's effect from a UI that has not reacted yet
+        before = fingerprint(default_capture().grab()) if wait else None
+        with Tracer.span('click', clicks=clicks):
+            for _ in range(clicks):
+                gui().click(x, y)
+        # wait is an upper bound: return as soon as the screen has changed and settled
+        if wait:
+            return settle(before, timeout=wait)
+        return True
+
+    def settle(before, region: tuple = None, timeout: float = 2) -> bool:
+        deadline = time.monotonic() + timeout
+        if not wait_until_changed(before, region=region, timeout=timeout):
+            print(f"    Screen did not change within {timeout}s.")
+            return False
+        wait_until_stable(region=region, timeout=max(0.5, deadline - time.monotonic()))
+        return True
 
     def apply():
         def img2txt(image) -> any:
-            return pytesseract.image_to_string(image)
+            # Unchanged pages are served from the OCR cache without running Tesseract
+            with Tracer.span('ocr'):
+                return OCR.text(image)
 
         def identify(page: str='') -> any:
-            page = page.lower()
-            page_keywords = {
-                'contact': ['contact info', 'email address', 'phone country code', 'mobile phone number'],
-                'resume': ['be sure to include an updated resume'],
-                'additional': ['how many years of work experience do you have with'],
-                'review': ['review your application', 'the employer will also receive a copy of your profile']
-            }
-            for page_type, keywords in page_keywords.items():
-                for keyword in keywords:
-                    if keyword in page:
-                        print(f"    Found {keyword}. Page is {page_type}.")
-                        return page_type
+            page_type, keyword = Pages.classify(page)
+            if page_type:
+                print(f"    Found {keyword}. Page is {page_type}.")
+            return page_type
 
         i: int = 0
         # Scan and fill out each application page.
         while i < 10:
-            # Screenshot application.
-            bottom_left: list = list(analyze(
-                target_img_path='../images/SubApp.png',
-                get_all_matches=True,
-                visual_debugger=True
-            ))[0]
+            # Screenshot application once; locate both corners and read the page from the same frame.
+            page = Frame(capture())
+            corners: dict = analyze_many({
+                '../images/SubApp.png': {'visual_debugger': True},
+                '../images/ExitIconAndZeroPercent.png': {'visual_debugger': False}
+            }, get_all_matches=True, adaptive_roi=True, frame=page)
+            bottom_left: list = list(corners['../images/SubApp.png'])[0]
             x1, y1 = bottom_left[0], bottom_left[1]
 
-            top_right: list = list(analyze(
-                target_img_path='../images/ExitIconAndZeroPercent.png',
-                get_all_matches=True,
-                visual_debugger=False
-            ))[0]
+            top_right: list = list(corners['../images/ExitIconAndZeroPercent.png'])[0]
             x2, y2 = top_right[0], top_right[1]
 
             # Introduce padding.
-            pl, _ = Image.open('../images/SubApp.png').size
-            pr, _ = Image.open('../images/ExitIconAndZeroPercent.png').size
+            pl, _ = Templates.get('../images/SubApp.png').size
+            pr, _ = Templates.get('../images/ExitIconAndZeroPercent.png').size
 
             # Ensure positive width and height, and adjust if necessary
             width = abs(x2 - x1 + pr)
@@ -263,9 +567,12 @@ def automation_series() -> None:
             )
 
             # Screen & scan page.
-            page_content: str = img2txt(screenie(region=region))
+            content: Frame = screenie(page, region=region)
+            page_content: str = img2txt(content)
             page_type: str = identify(page_content)
 
+            # Button searches below are incremental: only the part of the modal that changed since the last page is re-matched
+
             # Enter contact info
             if page_type == 'contact':
                 print(f"    PAGE TYPE: Contact")
@@ -274,9 +581,10 @@ def automation_series() -> None:
                     get_all_matches=True,
                     restrict_region=(screen_width//2, 0, (screen_width//2)-1, screen_height),
                     visual_debugger=True,
-                    match_threshold=.99
+                    match_threshold=.99,
+                    incremental=True
                 ))[0]
-                time.sleep(2)
+                wait_until_stable(region=region, timeout=2)
                 print(f"COORDS: {next_button}")
                 click(clicks=1, x=next_button[0], y=next_button[1], wait=2)
                 print(f"CLICKED: {next_button}")
@@ -289,32 +597,30 @@ def automation_series() -> None:
                     get_all_matches=True,
                     restrict_region=(screen_width//2, 0, (screen_width//2)-1, screen_height),
                     visual_debugger=True,
-                    match_threshold=.99
+                    match_threshold=.99,
+                    incremental=True
                 ))[0]
-                time.sleep(2)
+                wait_until_stable(region=region, timeout=2)
                 click(clicks=1, x=next_button[0], y=next_button[1], wait=2)
 
             # Logic for answering additional information
             elif page_type == 'additional':
                 print(f"    PAGE TYPE: Additional")
 
-                next_button: list = list(analyze(
-                    target_img_path='../images/Next.png',
+                buttons: dict = analyze_many(
+                    ['../images/Next.png', '../images/Review.png'],
                     get_all_matches=True,
                     restrict_region=(screen_width//2, 0, (screen_width//2)-1, screen_height),
                     visual_debugger=True,
-                    match_threshold=.99
-                ))[0]
+                    match_threshold=.99,
+                    incremental=True
+                )
+                next_button = buttons['../images/Next.png']
                 if next_button:
+                    next_button = list(next_button)[0]
                     click(clicks=1, x=next_button[0], y=next_button[1], wait=2)
                 else:
-                    review_button: list = list(analyze(
-                        target_img_path='../images/Review.png',
-                        get_all_matches=True,
-                        restrict_region=(screen_width//2, 0, (screen_width//2)-1, screen_height),
-                        visual_debugger=True,
-                        match_threshold=.99
-                    ))[0]
+                    review_button: list = list(buttons['../images/Review.png'])[0]
                     click(clicks=1, x=review_button[0], y=review_button[1], wait=2)
 
             # Unsubscribe to newletter & submit
@@ -325,7 +631,8 @@ def automation_series() -> None:
                     restrict_region=(screen_width//2, 0, (screen_width//2)-1, screen_height),
                     get_all_matches=True,
                     visual_debugger=True,
-                    match_threshold=.99
+                    match_threshold=.99,
+                    incremental=True
                 ))[0]
                 click(clicks=1, x=submit_button[0], y=submit_button[1], wait=2)
                 print(f"    Application submitted.")
@@ -333,13 +640,24 @@ def automation_series() -> None:
 
             # Increment to eventually hit the fail-safe stop
             i += 1
-            time.sleep(5)
+            # Read the next page only once it differs from the one just read; the OCR cache
+            # would otherwise return this page's text again and repeat its action
+            settle(fingerprint(content.bgr), region=region, timeout=5)
 
 
-    def change_page() -> None:
-        pass
+    def change_page() -> bool:
+        # Open the next results page, if there is one
+        next_page: list = wait_until_visible('../images/NextPage.png', timeout=2)
+        if next_page is None:
+            return False
+        click(clicks=1, x=next_page[0], y=next_page[1], wait=2)
+        return True
 
     # START _________________________________________________________
+    # The backend (and pyautogui's display connection) is only created once the series runs
+    screen_width, screen_height = default_capture().size()
+    # Listings already opened or applied to; only the series itself touches the database
+    listings = ListingIndex()
     i: int = 0
     current_time: str = time.strftime("%H:%M:%S")
     print(f"[ Starting @ {time.strftime('%Y-%m-%d')} ]")
@@ -348,15 +666,18 @@ def automation_series() -> None:
     # Automation Loop
     while True:
 
-        # Scan for all available 'Easy Apply' listings in page.
-        all_job_listings: list = list(analyze(
-            target_img_path='../images/EasyApplySmall.png',
-            get_all_matches=True,
-            visual_debugger=True
-        ))
+        # Apply to all 'Easy Apply' listings in page as the scanner scrolls to them.
+        for job_listing in scan():
+            frame = job_listing[2]
 
-        # Apply to all 'Easy Apply' listings.
-        for job_listing in all_job_listings:
+            # Skip listings opened on an earlier scan or page visit before clicking anything.
+            card = frame.crop((job_listing[0] + LISTING_CARD[0], job_listing[1] + LISTING_CARD[1], LISTING_CARD[2], LISTING_CARD[3]))
+            title, company = parse_card(OCR.text(card))
+            phash = listings.fingerprint(card)
+            if listings.lookup(phash, title, company):
+                print(f"    Skipping known listing: {title} | {company}")
+                continue
+            listings.mark(title=title, company=company, status='opened', phash=phash)
 
             # Track number of attempted applications.
             i += 1
@@ -369,23 +690,32 @@ def automation_series() -> None:
             application_start: list = list(analyze(
                 target_img_path='../images/EasyApply.png',
                 get_all_matches=True,
+                adaptive_roi=True,
                 visual_debugger=True,
             ))[0]
             click(clicks=1, x=application_start[0], y=application_start[1], wait=2)
 
             # Fill out all application fields.
             apply()
+            listings.mark(title=title, company=company, status='applied', phash=phash)
 
             # Complete.
             print(f"Applied.")
-            time.sleep(5)
-
-        # TEST: Return after 1
-        return
+            wait_until_gone('../images/SubmitApplication.png', timeout=5, threshold=.99)
+            wait_until_stable(timeout=5)
 
-        change_page()
+        if not change_page():
+            print(f"No more pages.")
+            return
 
 
 if __name__ == "__main__":
-    # main()
-    automation_series()
+    try:
+        # main()
+        automation_series()
+    finally:
+        # LOCATOR_TRACE=1 leaves a per-stage breakdown of the run
+        if Tracer.enabled:
+            Tracer.dump()
+            Tracer.export_jsonl("../logs/trace.jsonl")
+            Tracer.export_chrome("../logs/trace.json")
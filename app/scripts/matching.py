@@ -0,0 +1,245 @@
+from templates import MATCH_MODES, Template, TemplateRegistry, edge_map
+from frame import Frame
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import numpy as np
+import cv2
+
+Templates = TemplateRegistry()
+
+def template_image(target) -> any:
+    # Accept a template path, a registry entry or an already decoded array
+    if isinstance(target, str):
+        target = Templates.get(target)
+        if target is None:
+            return None
+    return target.bgr if hasattr(target, 'bgr') else target
+
+def as_template(target) -> Template:
+    # Like template_image() but keeps the registry entry so scaled copies are memoized
+    if isinstance(target, str):
+        return Templates.get(target)
+    if isinstance(target, Template) or target is None:
+        return target
+    return Template(None, 0.0, target)
+
+def frame_view(frame, mode: str = 'color') -> np.ndarray:
+    """
+    Converts a BGR capture frame for a matching mode: 'color' matches all three
+    channels in one matchTemplate call, 'gray' is about 3x cheaper and 'edge'
+    matches gradient magnitude for theme-insensitive buttons. Single-channel
+    inputs are taken to be converted already. Frames return their memoized view.
+    """
+    if isinstance(frame, Frame):
+        return frame.view(mode)
+    if mode not in MATCH_MODES:
+        raise ValueError(f"Unknown match mode {mode!r}, expected one of {MATCH_MODES}.")
+    if frame.ndim == 2 or mode == 'color':
+        return frame
+    if mode == 'gray':
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return edge_map(frame)
+
+def box_iou(box, boxes):
+    """IoU of one (x1, y1, x2, y2) box against an (N, 4+) array of boxes."""
+    ix1 = np.maximum(box[0], boxes[:, 0])
+    iy1 = np.maximum(box[1], boxes[:, 1])
+    ix2 = np.minimum(box[2], boxes[:, 2])
+    iy2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+def non_max_suppression(boxes, iou_threshold: float = 0.3, max_results: int = None):
+    """Greedy NMS over an (N, 5) array of [x1, y1, x2, y2, score] rows, best score first."""
+    if len(boxes) == 0:
+        return boxes
+    boxes = boxes[np.argsort(-boxes[:, 4], kind='stable')]
+    keep = []
+    remaining = boxes
+    while len(remaining) and (max_results is None or len(keep) < max_results):
+        best = remaining[0]
+        keep.append(best)
+        remaining = remaining[1:]
+        remaining = remaining[box_iou(best, remaining) <= iou_threshold]
+    return np.array(keep)
+
+def find_peaks(result, template_size: tuple, threshold: float, iou_threshold: float = 0.3, max_results: int = None):
+    """
+    Turns a matchTemplate score map into one scored box per object.
+
+    Pixels are kept only if they clear the threshold and are the maximum of their
+    half-template neighbourhood; the survivors go through IoU-based NMS.
+    Returns an (N, 5) float array of [x1, y1, x2, y2, score] sorted by score.
+    """
+    w, h = template_size
+    kernel = np.ones((max(3, (h // 2) | 1), max(3, (w // 2) | 1)), np.uint8)
+    local_max = cv2.dilate(result, kernel)
+    ys, xs = np.nonzero((result >= threshold) & (result >= local_max))
+    if len(xs) == 0:
+        return np.empty((0, 5))
+
+    scores = result[ys, xs]
+    boxes = np.column_stack((xs, ys, xs + w, ys + h, scores)).astype(np.float64)
+    return non_max_suppression(boxes, iou_threshold=iou_threshold, max_results=max_results)
+
+def score_map(image, templ):
+    # Normalized cross-correlation; 3-channel inputs are matched natively in one pass
+    return cv2.matchTemplate(image, templ, cv2.TM_CCOEFF_NORMED)
+
+def pyramid_peaks(image, templ, threshold: float, pyramid_levels: int = 2, coarse_threshold: float = None,
+                  candidates: int = 20, iou_threshold: float = 0.3, max_results: int = None, pyramid=None):
+    """
+    Coarse-to-fine search: match on a 2**pyramid_levels downsampled frame and template,
+    then rescore only a small window around each coarse peak at full resolution.
+    pyramid(level), when given, supplies the downsampled frame (e.g. Frame.pyramid).
+    Returns the same (N, 5) [x1, y1, x2, y2, score] array as find_peaks().
+    """
+    h, w = templ.shape[:2]
+    H, W = image.shape[:2]
+    if h > H or w > W:
+        return np.empty((0, 5))
+
+    # Keep at least 8px of template at the coarse level
+    while pyramid_levels > 0 and min(h, w) >> pyramid_levels < 8:
+        pyramid_levels -= 1
+    if pyramid_levels == 0:
+        result = score_map(image, templ)
+        return find_peaks(result, (w, h), threshold, iou_threshold=iou_threshold, max_results=max_results)
+
+    factor = 2 ** pyramid_levels
+    small = pyramid(pyramid_levels) if pyramid else cv2.resize(image, (W // factor, H // factor), interpolation=cv2.INTER_AREA)
+    small_templ = cv2.resize(templ, (max(1, w // factor), max(1, h // factor)), interpolation=cv2.INTER_AREA)
+    coarse = score_map(small, small_templ)
+
+    # Downsampling blurs the correlation peak, so the coarse pass uses a looser threshold
+    if coarse_threshold is None:
+        coarse_threshold = threshold * 0.8
+    peaks = find_peaks(coarse, small_templ.shape[1::-1], coarse_threshold, iou_threshold=iou_threshold, max_results=candidates)
+
+    refined = []
+    pad = factor * 2
+    for x1, y1 in peaks[:, :2].astype(int) * factor:
+        left, top = max(0, x1 - pad), max(0, y1 - pad)
+        right, bottom = min(W, x1 + w + pad), min(H, y1 + h + pad)
+        if right - left < w or bottom - top < h:
+            continue
+        result = score_map(image[top:bottom, left:right], templ)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if max_val >= threshold:
+            x, y = left + max_loc[0], top + max_loc[1]
+            refined.append((x, y, x + w, y + h, max_val))
+
+    if not refined:
+        return np.empty((0, 5))
+    return non_max_suppression(np.array(refined, dtype=np.float64), iou_threshold=iou_threshold, max_results=max_results)
+
+_tile_pools: dict = {}
+_tile_lock = threading.Lock()
+
+def tile_pool(workers: int) -> ThreadPoolExecutor:
+    # Kept apart from the per-template executors so nested submits cannot deadlock
+    with _tile_lock:
+        pool = _tile_pools.get(workers)
+        if pool is None:
+            pool = _tile_pools[workers] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tile')
+        return pool
+
+def tile_grid(frame_size: tuple, template_size: tuple, tiles: int) -> list:
+    """
+    Splits a (W, H) frame into about `tiles` (x1, y1, x2, y2) windows. Each window's
+    own top-left positions are disjoint from its neighbours', and it reaches
+    template_size - 1 pixels further so a template starting there fits whole.
+    """
+    W, H = frame_size
+    w, h = template_size
+    cols = max(1, min(tiles, int(round(np.sqrt(tiles * W / max(H, 1)))), (W - w + 1) // max(w, 1) or 1))
+    rows = max(1, min(-(-tiles // cols), (H - h + 1) // max(h, 1) or 1))
+    xs = np.linspace(0, W - w + 1, cols + 1).astype(int)
+    ys = np.linspace(0, H - h + 1, rows + 1).astype(int)
+    return [(int(x1), int(y1), int(x2) + w - 1, int(y2) + h - 1)
+            for y1, y2 in zip(ys[:-1], ys[1:]) for x1, x2 in zip(xs[:-1], xs[1:])]
+
+def tiled_peaks(image, templ, threshold: float, workers: int, pyramid_levels: int = 0,
+                iou_threshold: float = 0.3, max_results: int = None):
+    """
+    pyramid_peaks() over overlapping tiles matched concurrently on `workers` threads
+    (matchTemplate releases the GIL). Peaks from neighbouring tiles are merged by
+    NMS, so an object on a seam is reported once.
+    """
+    h, w = templ.shape[:2]
+    H, W = image.shape[:2]
+    if h > H or w > W:
+        return np.empty((0, 5))
+    grid = tile_grid((W, H), (w, h), workers)
+    if len(grid) == 1:
+        return pyramid_peaks(image, templ, threshold, pyramid_levels=pyramid_levels, iou_threshold=iou_threshold,
+                             max_results=max_results)
+
+    def match(tile):
+        x1, y1, x2, y2 = tile
+        peaks = pyramid_peaks(image[y1:y2, x1:x2], templ, threshold, pyramid_levels=pyramid_levels,
+                              iou_threshold=iou_threshold, max_results=max_results)
+        if len(peaks):
+            peaks[:, [0, 2]] += x1
+            peaks[:, [1, 3]] += y1
+        return peaks
+
+    found = [peaks for peaks in tile_pool(workers).map(match, grid) if len(peaks)]
+    if not found:
+        return np.empty((0, 5))
+    return non_max_suppression(np.vstack(found), iou_threshold=iou_threshold, max_results=max_results)
+
+def multi_scale_peaks(image, target, threshold: float, scales: tuple = (1.0,), pyramid_levels: int = 0,
+                      iou_threshold: float = 0.3, max_results: int = None, mode: str = 'color', workers: int = None):
+    """
+    Runs the (optionally pyramidal) search once per template scale, split over
+    `workers` tiles when workers > 1.
+    Returns an (N, 6) array of [x1, y1, x2, y2, score, scale] rows after cross-scale NMS.
+    """
+    template = as_template(target)
+    if template is None:
+        return np.empty((0, 6))
+    source = image
+    pyramid = (lambda level: source.pyramid(level, mode)) if isinstance(source, Frame) else None
+    image = frame_view(source, mode)
+    if image.ndim == 2 and mode == 'color':
+        mode = 'gray'
+    found = []
+    for scale in scales:
+        templ = template.scaled(scale).view(mode)
+        if workers and workers > 1:
+            peaks = tiled_peaks(image, templ, threshold, workers, pyramid_levels=pyramid_levels,
+                                iou_threshold=iou_threshold, max_results=max_results)
+        else:
+            peaks = pyramid_peaks(image, templ, threshold, pyramid_levels=pyramid_levels, iou_threshold=iou_threshold,
+                                  max_results=max_results, pyramid=pyramid)
+        if len(peaks):
+            found.append(np.column_stack((peaks, np.full(len(peaks), scale))))
+
+    if not found:
+        return np.empty((0, 6))
+    return non_max_suppression(np.vstack(found), iou_threshold=iou_threshold, max_results=max_results)
+
+def single_scaling(screenshot, target_image, threshold=.75, scales: tuple = (1.0,), pyramid_levels: int = 0,
+                   mode: str = 'color', workers: int = None):
+    template = as_template(target_image)
+    if template is None:
+        return None, None, None, None
+
+    peaks = multi_scale_peaks(screenshot, template, threshold, scales=scales, pyramid_levels=pyramid_levels,
+                              max_results=1, mode=mode, workers=workers)
+    if len(peaks):
+        x1, y1, x2, y2, max_val, best_scale = peaks[0]
+        return (int(x1), int(y1)), (int(x2), int(y2)), float(best_scale), float(max_val)
+    else:
+        return None, None, None, None
+
+def find_all_matches_color(screenshot, target, threshold, iou_threshold: float = 0.3, max_results: int = None,
+                           scales: tuple = (1.0,), pyramid_levels: int = 0, mode: str = 'color', workers: int = None):
+    # Match in the requested mode (BGR frames natively by default), then reduce
+    # to one scored box per object: [x1, y1, x2, y2, score]
+    peaks = multi_scale_peaks(screenshot, target, threshold, scales=scales, pyramid_levels=pyramid_levels,
+                              iou_threshold=iou_threshold, max_results=max_results, mode=mode, workers=workers)
+    return peaks[:, :5]
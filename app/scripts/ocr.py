@@ -0,0 +1,263 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, deque
+import threading
+import os
+import numpy as np
+import cv2
+
+def preprocess(image, max_width: int = 1600) -> np.ndarray:
+    """Grayscale, Otsu binarization and downscaling of wide regions before OCR."""
+    # Frames hand over their memoized grayscale view
+    gray = getattr(image, 'gray', None)
+    if gray is None:
+        image = np.asarray(image)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    height, width = gray.shape[:2]
+    if max_width and width > max_width:
+        scale = max_width / width
+        gray = cv2.resize(gray, (max_width, max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+def dhash(image, size: int = 8) -> int:
+    """size x size bit difference hash of an image (perceptual: survives small rendering noise)."""
+    small = cv2.resize(np.asarray(image), (size + 1, size), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+class OCRCache:
+    """LRU of OCR text keyed by the perceptual hash of the preprocessed region."""
+    def __init__(self, max_entries: int = 256, max_distance: int = 0) -> None:
+        self.max_entries: int = max_entries
+        self.max_distance: int = max_distance
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> str:
+        with self._lock:
+            text = self._entries.get(key)
+            if text is None and self.max_distance:
+                # Near-duplicate lookup among same-sized regions
+                for (shape, digest), cached in self._entries.items():
+                    if shape == key[0] and hamming(digest, key[1]) <= self.max_distance:
+                        key, text = (shape, digest), cached
+                        break
+            if text is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, key: tuple, text: str) -> None:
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+def split_tiles(binary, min_gap: int = 4, pad: int = 2) -> list:
+    """
+    Splits a binarized region into horizontal bands of text separated by at least
+    min_gap blank rows (small gaps give lines, larger gaps give paragraphs).
+    Returns (top, bottom) row ranges.
+    """
+    ink = (binary < 128).any(axis=1)
+    if ink.all() or not ink.any():
+        return [(0, binary.shape[0])]
+    rows = np.flatnonzero(ink)
+    breaks = np.flatnonzero(np.diff(rows) > min_gap)
+    starts = np.concatenate(([rows[0]], rows[breaks + 1]))
+    ends = np.concatenate((rows[breaks], [rows[-1]])) + 1
+    height = binary.shape[0]
+    return [(max(0, int(top) - pad), min(height, int(bottom) + pad)) for top, bottom in zip(starts, ends)]
+
+TILE_MODES = {
+    # mode: (blank rows between tiles, tesseract page segmentation mode)
+    'lines': (4, 7),
+    'paragraphs': (12, 6),
+}
+
+class OCRService:
+    """
+    Pool of warm OCR workers that take regions as in-memory arrays.
+
+    Each worker thread keeps its own initialized tesserocr PyTessBaseAPI, so
+    language data is loaded once per worker and no process is spawned per call.
+    tesserocr is a requirement, but it builds against libtesseract; where it is
+    missing the pool falls back to pytesseract, which still runs the calls in
+    parallel at the cost of one tesseract process per call.
+    """
+    def __init__(self, workers: int = None, lang: str = 'eng') -> None:
+        self.workers: int = workers or os.cpu_count() or 1
+        self.lang: str = lang
+        self._local = threading.local()
+        self._apis: list = []
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ocr')
+        try:
+            import tesserocr
+            self._tesserocr = tesserocr
+        except ImportError:
+            self._tesserocr = None
+
+    @property
+    def backend(self) -> str:
+        return 'tesserocr' if self._tesserocr else 'pytesseract'
+
+    def _api(self) -> any:
+        api = getattr(self._local, 'api', None)
+        if api is None:
+            api = self._local.api = self._tesserocr.PyTessBaseAPI(lang=self.lang)
+            self._apis.append(api)
+        return api
+
+    def _recognize(self, image, psm: int = None) -> str:
+        image = np.ascontiguousarray(image)
+        if self._tesserocr is not None:
+            api = self._api()
+            api.SetPageSegMode(self._tesserocr.PSM.AUTO if psm is None else psm)
+            channels = 1 if image.ndim == 2 else image.shape[2]
+            api.SetImageBytes(image.tobytes(), image.shape[1], image.shape[0], channels, image.strides[0])
+            return api.GetUTF8Text()
+
+        import pytesseract
+        return pytesseract.image_to_string(image, lang=self.lang, config=f'--psm {psm}' if psm else '')
+
+    def submit(self, image, psm: int = None) -> any:
+        return self._executor.submit(self._recognize, image, psm)
+
+    def recognize(self, image, tiles: str = None) -> str:
+        """
+        OCR one region, optionally split into line or paragraph tiles recognized in
+        parallel. Tiling needs tesserocr: pytesseract starts a process per call, so
+        without it the region is recognized whole.
+        """
+        if tiles is None or self._tesserocr is None:
+            return self.submit(image).result()
+        min_gap, psm = TILE_MODES[tiles]
+        binary = image if image.ndim == 2 else preprocess(image, max_width=None)
+        bands = split_tiles(binary, min_gap=min_gap)
+        futures = [self.submit(image[top:bottom], psm) for top, bottom in bands]
+        return '\n'.join(future.result().strip('\n') for future in futures)
+
+    def recognize_many(self, images: list, tiles: str = None) -> list:
+        # Whole-region jobs go straight to the pool; tiled jobs fan out themselves
+        if tiles is None:
+            return [future.result() for future in [self.submit(image) for image in images]]
+        with ThreadPoolExecutor(max_workers=max(1, min(len(images), self.workers))) as fan_out:
+            return list(fan_out.map(lambda image: self.recognize(image, tiles), images))
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        for api in self._apis:
+            api.End()
+        self._apis = []
+
+class OCRReader:
+    """Tesseract OCR through an OCRService, with preprocessing and a perceptual-hash result cache."""
+    def __init__(self, cache: OCRCache = None, max_width: int = 1600, service: OCRService = None, tiles: str = None) -> None:
+        self.cache: OCRCache = cache or OCRCache()
+        self.max_width: int = max_width
+        self.service: OCRService = service
+        self.tiles: str = tiles
+
+    def key(self, binary) -> tuple:
+        # Shape guards against hash collisions between differently sized regions
+        return binary.shape, dhash(binary, size=16)
+
+    def recognize(self, binary) -> str:
+        if self.service is None:
+            self.service = OCRService()
+        return self.service.recognize(binary, tiles=self.tiles)
+
+    def text(self, image) -> str:
+        if image is None:
+            return ''
+        binary = preprocess(image, self.max_width)
+        key = self.key(binary)
+        text = self.cache.get(key)
+        if text is None:
+            text = self.recognize(binary)
+            self.cache.put(key, text)
+        return text
+
+class AhoCorasick:
+    """Multi-pattern substring matcher: one pass over the text for every pattern."""
+    def __init__(self, patterns: list) -> None:
+        self.goto: list = [{}]
+        self.fail: list = [0]
+        self.output: list = [[]]
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str) -> None:
+        state = 0
+        for char in pattern:
+            nxt = self.goto[state].get(char)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][char] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = nxt
+        self.output[state].append(pattern)
+
+    def _build(self) -> None:
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(char, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def search(self, text: str):
+        """Yields (end_index, pattern) for every occurrence."""
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for pattern in self.output[state]:
+                yield i, pattern
+
+class PageClassifier:
+    """
+    Classifies OCR text by keyword with a single Aho-Corasick pass. When several
+    page types match, the one listed first in page_keywords wins.
+    """
+    def __init__(self, page_keywords: dict) -> None:
+        self.page_keywords: dict = page_keywords
+        self.priority: dict = {}
+        self.page_of: dict = {}
+        for rank, (page_type, keywords) in enumerate(page_keywords.items()):
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword not in self.page_of:
+                    self.page_of[keyword] = page_type
+                    self.priority[keyword] = rank
+        self.automaton = AhoCorasick(list(self.page_of))
+
+    def classify(self, text: str) -> tuple:
+        """Returns (page_type, keyword), or (None, None) when nothing matches."""
+        best = None
+        for _, keyword in self.automaton.search((text or '').lower()):
+            if best is None or self.priority[keyword] < self.priority[best]:
+                best = keyword
+                if self.priority[best] == 0:
+                    break
+        if best is None:
+            return None, None
+        return self.page_of[best], best
@@ -1,13 +1,174 @@
-import matplotlib.patches as patches
-import matplotlib.pyplot as plt
+from coordlog import CoordinateLog
+from heatmap import Heatmap, heatmap_path
+from tracing import Tracer
 import numpy as np
+import threading
+import atexit
 import json
 import os
-import csv
 
-class Log:
+class P2Quantile:
+    """Streaming quantile estimate in O(1) per update (Jain & Chlamtac's P-square algorithm)."""
+    def __init__(self, p: float) -> None:
+        self.p: float = p
+        self.n: int = 0
+        self.q: list = []
+        self.pos: list = [1, 2, 3, 4, 5]
+        self.desired: list = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increment: list = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def update(self, x: float) -> None:
+        q = self.q
+        self.n += 1
+        if self.n <= 5:
+            q.append(x)
+            q.sort()
+            return
+
+        # Find the cell x falls in, extending the extremes if needed
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            self.pos[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increment[i]
+
+        # Nudge the three middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = self.desired[i] - self.pos[i]
+            if (d >= 1 and self.pos[i + 1] - self.pos[i] > 1) or (d <= -1 and self.pos[i - 1] - self.pos[i] < -1):
+                d = 1 if d > 0 else -1
+                estimate = self._parabolic(i, d)
+                if not q[i - 1] < estimate < q[i + 1]:
+                    estimate = q[i] + d * (q[i + d] - q[i]) / (self.pos[i + d] - self.pos[i])
+                q[i] = estimate
+                self.pos[i] += d
+
+    def _parabolic(self, i: int, d: int) -> float:
+        q, n = self.q, self.pos
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self) -> float:
+        if self.n == 0:
+            return None
+        if self.n < 5:
+            return float(np.percentile(self.q, self.p * 100))
+        return self.q[2]
+
+class RunningStats:
+    """Welford's running mean and (population) variance."""
     def __init__(self) -> None:
+        self.n: int = 0
+        self.mean: float = 0.0
+        self.m2: float = 0.0
+
+    def update(self, x: float) -> None:
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / self.n if self.n else 0.0
+
+class StreamingRegion:
+    """
+    Incremental version of Log.optimize() for one template.
+
+    Quartiles of each coordinate are tracked with P2Quantile; a coordinate only
+    feeds the running mean/variance if it falls within the IQR fence of the
+    history seen so far. Every update is O(1) after the warmup samples.
+    """
+    def __init__(self, mult: float = 3.0, variance_factor: float = 2, warmup: int = 5) -> None:
+        self.mult: float = mult
+        self.variance_factor: float = variance_factor
+        self.warmup: int = warmup
+        self.pending: list = [[] for _ in range(4)]
+        self.q1: list = [P2Quantile(0.25) for _ in range(4)]
+        self.q3: list = [P2Quantile(0.75) for _ in range(4)]
+        self.stats: list = [RunningStats() for _ in range(4)]
+
+    @property
+    def samples(self) -> int:
+        return self.q1[0].n
+
+    def update(self, box) -> None:
+        for i, v in enumerate(box):
+            v = float(v)
+            self.q1[i].update(v)
+            self.q3[i].update(v)
+
+            # The first samples are held back until the fence can judge them too
+            if self.q1[i].n < self.warmup:
+                self.pending[i].append(v)
+                continue
+            for pending in self.pending[i] + [v]:
+                if self.inside(i, pending):
+                    self.stats[i].update(pending)
+            self.pending[i] = []
+
+    def inside(self, i: int, v: float) -> bool:
+        q1, q3 = self.q1[i].value(), self.q3[i].value()
+        iqr = q3 - q1
+        return q1 - self.mult * iqr <= v <= q3 + self.mult * iqr
+
+    def region(self) -> list:
+        if any(stats.n == 0 for stats in self.stats):
+            return None
+        (avg_x1, avg_y1, avg_x2, avg_y2) = (stats.mean for stats in self.stats)
+        (std_x1, std_y1, std_x2, std_y2) = (np.sqrt(stats.variance) for stats in self.stats)
+        width = (avg_x2 - avg_x1) + self.variance_factor * std_x2
+        height = (avg_y2 - avg_y1) + self.variance_factor * std_y2
+        return [float(avg_x1 - self.variance_factor * std_x1), float(avg_y1 - self.variance_factor * std_y1), float(width), float(height)]
+
+    def moved(self, saved: list, tolerance: float) -> bool:
+        region = self.region()
+        if region is None:
+            return False
+        if saved is None:
+            return True
+        return max(abs(a - b) for a, b in zip(region, saved)) > tolerance
+
+class Log:
+    def __init__(self, region_tolerance: float = 5.0, deferred: bool = False, heatmap_size: tuple = (2560, 1440),
+                 heatmap_cell: int = 4) -> None:
         self.CSV_PATH: str = "../config/coordinate_log.csv"
+        self.COORDS_DIR: str = "../config/coordinates"
+        self.CONFIG_PATH: str = "automation_config.json"
+        self.coords = CoordinateLog(self.COORDS_DIR)
+        self.region_tolerance: float = region_tolerance
+        self.streams: dict = {}
+        # Geometry of heatmaps created from now on; existing heatmap files keep their own
+        self.heatmap_size: tuple = heatmap_size
+        self.heatmap_cell: int = heatmap_cell
+        self.heatmaps: dict = {}
+        # Last region written per template, compared against instead of anything a rebuilt stream remembers
+        self._saved: dict = None
+
+        # Deferred logs hand config writes to a background thread, newest region per template wins
+        self.deferred: bool = deferred
+        self._lock = threading.RLock()
+        self._pending: dict = {}
+        self._writing: bool = False
+        self._writes = threading.Condition()
+        self._writer = None
+
+        # One-time migration of the legacy CSV log
+        if not os.path.exists(self.COORDS_DIR) and os.path.exists(self.CSV_PATH):
+            self.import_csv()
 
     def remove_outliers(self, values):
         """Removes outliers based on the IQR method."""
@@ -17,50 +178,138 @@ class Log:
         iqr = q3 - q1
         lower_bound = q1 - mult * iqr
         upper_bound = q3 + mult * iqr
-        return [v for v in values if lower_bound <= v <= upper_bound]
-
-    def optimize(self) -> None:
-        if not os.path.exists(self.CSV_PATH):
-            print(f"{self.CSV_PATH} not found. No averaging needed.")
-            return None, None
-
-        sum_x1, sum_y1, sum_x2, sum_y2 = 0, 0, 0, 0
-        num_entries = 0
-        coord_pair = []
-        x1_vals, y1_vals, x2_vals, y2_vals = [], [], [], []
-
+        values = np.asarray(values)
+        return values[(values >= lower_bound) & (values <= upper_bound)]
+
+    @Tracer.traced('Log.record')
+    def record(self, template: str, top_left: tuple, bottom_right: tuple) -> None:
+        with self._lock:
+            # Streams and heatmaps seed from the ring, so they must exist before the box lands there or it counts twice
+            self.stream(template)
+            self.stream(None)
+            heatmap = self.accumulator(template)
+            self.coords.append(template, top_left, bottom_right)
+            self.update(template, (top_left[0], top_left[1], bottom_right[0], bottom_right[1]))
+            heatmap.add((top_left[0], top_left[1], bottom_right[0], bottom_right[1]))
+
+    def stream(self, template: str = None) -> StreamingRegion:
+        # Streams start from the persisted ring history, then update one match at a time
+        stream = self.streams.get(template)
+        if stream is None:
+            stream = StreamingRegion()
+            for box in self.coords.boxes(template).tolist():
+                stream.update(box)
+            self.streams[template] = stream
+        return stream
+
+    def update(self, template: str, box: tuple) -> None:
+        # Per-template region plus the global region across every template
+        for key in ((template, None) if template is not None else (None,)):
+            stream = self.stream(key)
+            stream.update(box)
+            if stream.moved(self.saved(key), self.region_tolerance):
+                self.save_region(key, stream.region())
+
+    def saved(self, template: str = None) -> list:
+        # Regions already in the config count as written
+        if self._saved is None:
+            config = {}
+            if os.path.exists(self.CONFIG_PATH):
+                with open(self.CONFIG_PATH, mode='r') as json_file:
+                    config = json.load(json_file).get("analyze", {})
+            self._saved = dict(config.get("regions", {}))
+            if config.get("optimize_region"):
+                self._saved[None] = config["optimize_region"]
+        return self._saved.get(template)
+
+    def region(self, template: str = None) -> list:
+        """
+        Current learned region (x, y, width, height), straight from memory. Like
+        optimize(), it covers only the boxes still in the ring: limit() reseeds a
+        stream once it has seen more boxes than its trimmed ring holds.
+        """
+        return self.stream(template).region()
+
+    def reset(self, template: str, recent: int = 10) -> list:
+        # Relearn from the newest entries only
+        stream = StreamingRegion()
+        for box in self.coords.boxes(template)[-recent:].tolist():
+            stream.update(box)
+        self.streams[template] = stream
+        return stream.region()
+
+    @Tracer.traced('Log.save_region')
+    def save_region(self, template: str, region: list) -> None:
+        self.saved(template)
+        self._saved[template] = region
+        if not self.deferred:
+            self.write_regions({template: region})
+            return
+        with self._writes:
+            self._pending[template] = region
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_pending, name='config-writer', daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+            self._writes.notify()
+
+    def write_regions(self, regions: dict) -> None:
+        # Per-template regions are kept alongside the global one
+        config = {}
+        if os.path.exists(self.CONFIG_PATH):
+            with open(self.CONFIG_PATH, mode='r') as json_file:
+                config = json.load(json_file)
+        analyze_config = config.setdefault("analyze", {})
+        for template, region in regions.items():
+            if template is None:
+                analyze_config["optimize_region"] = region
+            else:
+                analyze_config.setdefault("regions", {})[template] = region
+
+        with open(self.CONFIG_PATH, mode='w') as json_file:
+            json.dump(config, json_file, indent=4)
+
+    def _write_pending(self) -> None:
+        while True:
+            with self._writes:
+                while not self._pending:
+                    self._writes.wait()
+                regions, self._pending = self._pending, {}
+                self._writing = True
+            try:
+                self.write_regions(regions)
+            except Exception as e:
+                print(f"Error writing {self.CONFIG_PATH}: {e}")
+            finally:
+                with self._writes:
+                    self._writing = False
+                    self._writes.notify_all()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Waits for deferred config writes; also syncs the coordinate rings to disk."""
+        with self._writes:
+            done = self._writes.wait_for(lambda: not self._pending and not self._writing, timeout=timeout) if self._writer else True
+        with self._lock:
+            self.coords.flush()
+            for heatmap in self.heatmaps.values():
+                heatmap.flush()
+        return done
+
+    @Tracer.traced('Log.optimize')
+    def optimize(self, template: str = None) -> None:
         # Read Log
-        with open(self.CSV_PATH, mode='r') as file:
-            reader = csv.reader(file)
-            for row in reader:
-                if len(row) < 2:
-                    continue
-
-                # Analyze Coordinates
-                x1, y1 = eval(row[0])
-                x2, y2 = eval(row[1])
-                center_x = (x1 + x2) / 2
-                center_y = (y1 + y2) / 2
-
-                # Append both the center point and the bounding box to the list
-                coord_pair.append(((center_x, center_y), ((x1, y1), (x2, y2))))
-
-                # Store values for variance and outlier removal
-                x1_vals.append(x1)
-                y1_vals.append(y1)
-                x2_vals.append(x2)
-                y2_vals.append(y2)
-
-                sum_x1 += x1
-                sum_y1 += y1
-                sum_x2 += x2
-                sum_y2 += y2
-                num_entries += 1
+        boxes = self.coords.boxes(template).astype(np.float64)
+        num_entries = len(boxes)
 
         if num_entries == 0:
-            print("No valid entries found in the CSV.")
+            print("No valid entries found in the coordinate log.")
             return None, None
 
+        # Analyze Coordinates: keep both the center point and the bounding box
+        x1_vals, y1_vals, x2_vals, y2_vals = boxes.T
+        centers = np.column_stack(((x1_vals + x2_vals) / 2, (y1_vals + y2_vals) / 2))
+        coord_pair = [((cx, cy), ((x1, y1), (x2, y2))) for (cx, cy), (x1, y1, x2, y2) in zip(centers.tolist(), boxes.tolist())]
+
         # Remove outliers using the IQR method
         x1_vals_filtered = self.remove_outliers(x1_vals)
         y1_vals_filtered = self.remove_outliers(y1_vals)
@@ -89,14 +338,14 @@ class Log:
         adjusted_y1 = avg_y1 - variance_factor * np.sqrt(var_y1)
 
         # Save Optimized Coordinates as optimize_region (x, y, width, height)
+        region = [float(adjusted_x1), float(adjusted_y1), float(width), float(height)]
         optimized_coordinates = {
             "analyze": {
-                "optimize_region": [adjusted_x1, adjusted_y1, width, height]
+                "optimize_region": region
             }
         }
 
-        with open('automation_config.json', mode='w') as json_file:
-            json.dump(optimized_coordinates, json_file, indent=4)
+        self.save_region(template, region)
 
         print(f"    Optimized coordinates saved to 'automation_config.json': {optimized_coordinates}")
 
@@ -110,52 +359,74 @@ class Log:
         return (x_min, y_min), (x_max, y_max)
 
 
-    def visualize(self, coord_pair, avg_coords, screen_width: int=1920, screen_height: int=1080):
-        fig, ax = plt.subplots(figsize=(10, 6))
-
-        for (center_x, center_y), (top_left, bottom_right) in coord_pair:
-            if 0 <= center_x < screen_width and 0 <= center_y < screen_height:
-                x1, y1 = top_left
-                x2, y2 = bottom_right
-
-                width = x2 - x1
-                height = y2 - y1
-
-                rect = patches.Rectangle((x1, y1), width, height, linewidth=1, edgecolor='blue', facecolor='none')
-                ax.add_patch(rect)
+    def visualize(self, coord_pair, avg_coords, screen_width: int=2560, screen_height: int=1440,
+                  path: str='../logs/heatmap.png') -> str:
+        # Headless: coverage of every box plus the average hit area, written to path
+        heatmap = Heatmap((screen_width, screen_height))
+        heatmap.add([(x1, y1, x2, y2) for _, ((x1, y1), (x2, y2)) in coord_pair])
 
         avg_x1, avg_y1 = avg_coords["top_left"]
         avg_x2, avg_y2 = avg_coords["bottom_right"]
-
-        avg_width = avg_x2 - avg_x1
-        avg_height = avg_y2 - avg_y1
-
-        avg_rect = patches.Rectangle((avg_x1, avg_y1), avg_width, avg_height, linewidth=2, edgecolor='red', facecolor='none')
-        ax.add_patch(avg_rect)
-
-        plt.title("Coordinates with Bounding Boxes and Average Hit Area")
-        plt.xlabel("Screen Width")
-        plt.ylabel("Screen Height")
-
-        handles = [
-            patches.Patch(edgecolor='blue', facecolor='none', label='Hit Areas'),
-            patches.Patch(edgecolor='red', facecolor='none', label='Average Hit Area')
-        ]
-        plt.legend(handles=handles, loc="upper right")
-
-        ax.set_xlim(0, screen_width)
-        ax.set_ylim(screen_height, 0)
-
-        plt.show()
-
-    def limit(self, max_entries: int):
-        if os.path.exists(self.CSV_PATH):
-            with open(self.CSV_PATH, mode='r') as file:
-                lines = list(csv.reader(file))
-
-            if len(lines) > max_entries:
-                lines = lines[-max_entries:]
-
-            with open(self.CSV_PATH, mode='w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerows(lines)
+        heatmap.render(path, region=(avg_x1, avg_y1, avg_x2 - avg_x1, avg_y2 - avg_y1),
+                       title="Coordinates with Bounding Boxes and Average Hit Area")
+        print(f"    Heatmap saved to {path}")
+        return path
+
+    def accumulator(self, template: str) -> Heatmap:
+        # Persisted next to the template's ring; record() adds every box, however far limit() trims the ring
+        with self._lock:
+            heatmap = self.heatmaps.get(template)
+            if heatmap is None:
+                ring = self.coords.ring(template)
+                path = os.path.splitext(ring.path)[0] + '.heat' if ring.path else None
+                fresh = path is None or not os.path.exists(path)
+                heatmap = Heatmap(self.heatmap_size, self.heatmap_cell, path)
+                if fresh:
+                    # Boxes logged before the heatmap existed are all the history there is
+                    heatmap.add(ring.boxes())
+                self.heatmaps[template] = heatmap
+            return heatmap
+
+    def heatmap(self, template: str = None) -> Heatmap:
+        """Coverage heatmap of every box ever recorded for a template (every template when None)."""
+        if template is not None:
+            return self.accumulator(template)
+        heatmaps = [self.accumulator(name) for name in self.coords.templates()]
+        size, cell = (heatmaps[0].screen_size, heatmaps[0].cell) if heatmaps else (self.heatmap_size, self.heatmap_cell)
+        merged = Heatmap(size, cell)
+        for heatmap in heatmaps:
+            merged.merge(heatmap)
+        return merged
+
+    def render_heatmaps(self, directory: str = '../logs/heatmaps', templates: list = None) -> list:
+        # One PNG per template with its learned region overlaid
+        paths = []
+        for template in templates if templates is not None else self.coords.templates():
+            path = heatmap_path(directory, template)
+            self.heatmap(template).render(path, region=self.region(template), title=template or None)
+            paths.append(path)
+        return paths
+
+    @Tracer.traced('Log.limit')
+    def limit(self, max_entries: int, template: str = None):
+        # Trimming only moves the ring window; nothing is rewritten
+        with self._lock:
+            trimmed = self.coords.limit(max_entries, template)
+            # The estimators cannot forget samples, so a stream that has seen more boxes than its ring
+            # now holds is rebuilt from the ring on next use; relearned streams have seen fewer and stay
+            for name in trimmed:
+                stream = self.streams.get(name)
+                if stream is not None and stream.samples > len(self.coords.ring(name)):
+                    del self.streams[name]
+            stream = self.streams.get(None)
+            if trimmed and stream is not None and stream.samples > len(self.coords):
+                del self.streams[None]
+
+    def import_csv(self, csv_path: str = None) -> int:
+        csv_path = csv_path or self.CSV_PATH
+        if not os.path.exists(csv_path):
+            return 0
+        imported = self.coords.import_csv(csv_path)
+        self.coords.flush()
+        print(f"Imported {imported} entries from {csv_path}.")
+        return imported
@@ -0,0 +1,181 @@
+from collections import deque
+from tracing import Tracer
+import threading
+import time
+
+class FrameQueue:
+    """
+    Bounded hand-off between pipeline stages. A full queue drops its oldest item,
+    so a slow consumer always works on the freshest frame instead of a backlog.
+    """
+    def __init__(self, maxsize: int = 2) -> None:
+        self.dropped: int = 0
+        self.closed: bool = False
+        self._items: deque = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+
+    def put(self, item) -> bool:
+        with self._cond:
+            if self.closed:
+                return False
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+            return True
+
+    def get(self, timeout: float = None) -> any:
+        """Oldest queued item, or None on timeout or once the queue is closed and empty."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._items or self.closed, timeout=timeout)
+            return self._items.popleft() if self._items else None
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+class Packet:
+    __slots__ = ('seq', 'captured', 'frame', 'result')
+
+    def __init__(self, seq: int, captured: float, frame) -> None:
+        self.seq: int = seq
+        self.captured: float = captured
+        self.frame = frame
+        self.result = None
+
+class Pipeline:
+    """
+    Overlapped capture -> match -> act loop.
+
+    Capture and matching each run on their own thread, connected by bounded
+    FrameQueues, while act(frame, result) runs on the thread that called run().
+    Frame N+1 is captured while frame N is matched and frame N-1 acted on.
+
+    An act that changes the screen (a click, a scroll) should call invalidate():
+    frames captured before that moment are then dropped wherever they are
+    queued instead of being acted on twice. act returning False ends the run.
+    """
+    def __init__(self, capture, match, act=None, depth: int = 2, interval: float = 0.0) -> None:
+        self.capture = capture
+        self.match = match
+        self.act = act
+        self.interval: float = interval
+        self.frames: FrameQueue = FrameQueue(depth)
+        self.results: FrameQueue = FrameQueue(depth)
+        self.captured: int = 0
+        self.matched: int = 0
+        self.acted: int = 0
+        self.stale: int = 0
+        self._barrier: float = 0.0
+        self._stop = threading.Event()
+        self._error: BaseException = None
+        self._threads: list = []
+
+    def invalidate(self) -> None:
+        # Everything captured before now shows a screen that no longer exists
+        self._barrier = time.monotonic()
+
+    def cancel(self) -> None:
+        """Stops every stage; safe to call from any thread, including inside act."""
+        self._stop.set()
+        self.frames.close()
+        self.results.close()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._stop.is_set()
+
+    def _is_stale(self, packet: Packet) -> bool:
+        if packet.captured < self._barrier:
+            self.stale += 1
+            return True
+        return False
+
+    def _guard(self, stage):
+        # Stage errors stop the pipeline and are re-raised from run()
+        def loop():
+            try:
+                stage()
+            except BaseException as e:
+                self._error = self._error or e
+                self.cancel()
+        return loop
+
+    def _capture_loop(self) -> None:
+        seq = 0
+        while not self._stop.is_set():
+            started = time.monotonic()
+            with Tracer.span('pipeline.capture'):
+                frame = self.capture()
+            seq += 1
+            self.captured += 1
+            self.frames.put(Packet(seq, started, frame))
+            if self.interval:
+                self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def _match_loop(self) -> None:
+        while not self._stop.is_set():
+            packet = self.frames.get(timeout=0.1)
+            if packet is None or self._is_stale(packet):
+                continue
+            with Tracer.span('pipeline.match', seq=packet.seq):
+                packet.result = self.match(packet.frame)
+            self.matched += 1
+            self.results.put(packet)
+
+    def start(self) -> None:
+        for name, stage in (('pipeline-capture', self._capture_loop), ('pipeline-match', self._match_loop)):
+            thread = threading.Thread(target=self._guard(stage), name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.cancel()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run(self, max_results: int = None, timeout: float = None, stall_timeout: float = None) -> int:
+        """
+        Acts on matched frames until cancelled, max_results frames have been acted
+        on, or timeout seconds pass. Raises TimeoutError if no result arrives for
+        stall_timeout seconds. Returns the number of frames acted on.
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        last_result = time.monotonic()
+        self.start()
+        try:
+            while not self._stop.is_set():
+                if deadline and time.monotonic() >= deadline:
+                    break
+                packet = self.results.get(timeout=0.1)
+                if packet is None:
+                    if stall_timeout and time.monotonic() - last_result > stall_timeout:
+                        raise TimeoutError(f"No match result for {stall_timeout}s.")
+                    continue
+                last_result = time.monotonic()
+                if self._is_stale(packet):
+                    continue
+                with Tracer.span('pipeline.act', seq=packet.seq):
+                    keep_going = self.act(packet.frame, packet.result) if self.act else None
+                self.acted += 1
+                if keep_going is False or (max_results and self.acted >= max_results):
+                    break
+        finally:
+            self.stop()
+        if self._error is not None:
+            raise self._error
+        return self.acted
+
+    def stats(self) -> dict:
+        return {
+            "captured": self.captured,
+            "matched": self.matched,
+            "acted": self.acted,
+            "stale": self.stale,
+            "dropped": self.frames.dropped + self.results.dropped
+        }
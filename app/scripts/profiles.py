@@ -0,0 +1,61 @@
+import threading
+import json
+import os
+
+# Used when config/config.json is missing or leaves a setting out
+DEFAULTS = {
+    "match_threshold": 0.75,
+    "limit_optimizer": 20
+}
+
+def load_defaults(path: str = '../config/config.json') -> dict:
+    """The "analyze" section of config.json over DEFAULTS."""
+    defaults = dict(DEFAULTS)
+    if os.path.exists(path):
+        with open(path, mode='r') as json_file:
+            analyze_config = json.load(json_file).get("analyze", {})
+        defaults.update({key: analyze_config[key] for key in DEFAULTS if analyze_config.get(key) is not None})
+    return defaults
+
+class Profiles:
+    """
+    Per-template match settings written by calibrate.py:
+
+        {"../images/Next.png": {"match_threshold": 0.83, "match_mode": "gray",
+                                "pyramid_levels": 1, "optimize_region": [x, y, width, height]}}
+
+    The file is read once, on first use; regions are in full-screen coordinates.
+    """
+    def __init__(self, path: str = '../config/profiles.json') -> None:
+        self.path: str = path
+        self._profiles: dict = None
+        self._lock = threading.Lock()
+
+    def load(self) -> dict:
+        with self._lock:
+            if self._profiles is None:
+                profiles = {}
+                if os.path.exists(self.path):
+                    with open(self.path, mode='r') as json_file:
+                        profiles = json.load(json_file)
+                self._profiles = profiles
+            return self._profiles
+
+    def get(self, template: str) -> dict:
+        return self.load().get(template)
+
+    def save(self, profiles: dict) -> None:
+        # Merges into the existing file so templates can be calibrated one at a time
+        with self._lock:
+            existing = {}
+            if os.path.exists(self.path):
+                with open(self.path, mode='r') as json_file:
+                    existing = json.load(json_file)
+            existing.update(profiles)
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, mode='w') as json_file:
+                json.dump(existing, json_file, indent=4)
+            self._profiles = existing
+
+    def __contains__(self, template: str) -> bool:
+        return template in self.load()
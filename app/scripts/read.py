@@ -1,17 +1,52 @@
-from PIL import Image
-import pytesseract
+from ocr import OCRService, preprocess
+from capture import IMAGE_EXTENSIONS
+import argparse
+import cv2
+import os
 
-def extract_text_from_image(image_path):
-    # Open the image file
-    img = Image.open(image_path)
+_service = None
 
-    # Use pytesseract to do OCR on the image
-    text = pytesseract.image_to_string(img)
+def service() -> OCRService:
+    # One warm worker pool per process
+    global _service
+    if _service is None:
+        _service = OCRService()
+    return _service
+
+def load_image(image_path):
+    # Read the image file into an in-memory BGR buffer, like a captured frame
+    img = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    if img is None:
+        raise FileNotFoundError(f"Cannot read image {image_path}.")
+    return img
+
+def extract_text_from_image(image_path, tiles: str = None):
+    # Use the OCR worker pool on the image
+    text = service().recognize(preprocess(load_image(image_path)), tiles=tiles)
 
     return text
 
+def extract_text_from_directory(directory, tiles: str = None) -> dict:
+    """OCRs every image in directory through the worker pool; returns {path: text}."""
+    paths = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    images = [preprocess(load_image(path)) for path in paths]
+    return dict(zip(paths, service().recognize_many(images, tiles=tiles)))
+
 # Example usage
-image_path = 'example_image.png'
-text = extract_text_from_image(image_path)
-print("Extracted Text:")
-print(text)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract text from an image or a directory of images.")
+    parser.add_argument("path", nargs="?", default="example_image.png")
+    parser.add_argument("--tiles", choices=["lines", "paragraphs"], default=None)
+    args = parser.parse_args()
+
+    if os.path.isdir(args.path):
+        for image_path, text in extract_text_from_directory(args.path, tiles=args.tiles).items():
+            print(f"Extracted Text ({image_path}):")
+            print(text)
+    else:
+        text = extract_text_from_image(args.path, tiles=args.tiles)
+        print("Extracted Text:")
+        print(text)
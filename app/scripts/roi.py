@@ -0,0 +1,128 @@
+from collections import deque
+import threading
+import json
+import os
+
+class AdaptiveROI:
+    """
+    Per-template search regions, live from a source such as Log.region or
+    loaded once from automation_config.json.
+
+    A search starts in the learned region padded by the template size on every
+    side, widens it by each growth factor on a miss and only falls back to the
+    full frame last. A match touching the edge of a region may be a button cut
+    off by it, so it counts as a miss there. Hit/miss outcomes of the
+    learned region are tracked per template; once the miss rate over the window
+    reaches relearn_miss_rate the region is dropped so it can be relearned.
+    """
+    def __init__(self,
+                 config_path: str = 'automation_config.json',
+                 growth: tuple = (1.0, 1.5, 2.5),
+                 window: int = 20,
+                 relearn_miss_rate: float = 0.5,
+                 source = None
+                 ) -> None:
+        self.config_path: str = config_path
+        self.growth: tuple = growth
+        self.window: int = window
+        self.relearn_miss_rate: float = relearn_miss_rate
+        self.source = source
+        self.regions: dict = None
+        self.outcomes: dict = {}
+        self._stale: set = set()
+        self._lock = threading.Lock()
+
+    def load(self) -> dict:
+        # Learned regions are read from disk once; later updates arrive through learn()
+        if self.regions is None:
+            regions = {}
+            if os.path.exists(self.config_path):
+                with open(self.config_path, mode='r') as json_file:
+                    config = json.load(json_file).get("analyze", {})
+                regions = {path: tuple(region) for path, region in config.get("regions", {}).items()}
+            self.regions = regions
+        return self.regions
+
+    def region(self, template: str) -> tuple:
+        # A live source (e.g. Log.region) wins over regions loaded from disk
+        if self.source is not None and template not in self._stale:
+            region = self.source(template)
+            if region is not None:
+                return tuple(region)
+        return self.load().get(template)
+
+    def learn(self, template: str, region) -> None:
+        with self._lock:
+            self.load()
+            if region is None:
+                self.regions.pop(template, None)
+            else:
+                self.regions[template] = tuple(float(v) for v in region)
+            self.outcomes.pop(template, None)
+            self._stale.discard(template)
+
+    def candidates(self, template: str, frame_size: tuple, padding: tuple = (0, 0)) -> list:
+        """
+        Search regions (x, y, width, height) in order, ending with None for the full
+        frame. padding (usually the template size) is added on all four sides.
+        """
+        frame_width, frame_height = frame_size
+        pad_x, pad_y = padding
+        learned = self.region(template)
+        regions = []
+        if learned is not None:
+            x, y, width, height = learned
+            cx, cy = x + width / 2, y + height / 2
+            for factor in self.growth:
+                w, h = width * factor + 2 * pad_x, height * factor + 2 * pad_y
+                left, top = max(0, int(cx - w / 2)), max(0, int(cy - h / 2))
+                right, bottom = min(frame_width, int(cx + w / 2) + 1), min(frame_height, int(cy + h / 2) + 1)
+                if right <= left or bottom <= top:
+                    continue
+                region = (left, top, right - left, bottom - top)
+                if region[2] >= frame_width and region[3] >= frame_height:
+                    break
+                if region not in regions:
+                    regions.append(region)
+        regions.append(None)
+        return regions
+
+    @staticmethod
+    def on_border(boxes, region: tuple, frame_size: tuple) -> bool:
+        """True when any [x1, y1, x2, y2] box (in region coordinates) touches an edge of region inside the frame."""
+        if region is None:
+            return False
+        x, y, width, height = region
+        frame_width, frame_height = frame_size
+        for x1, y1, x2, y2 in boxes:
+            if ((x > 0 and x1 <= 0) or (y > 0 and y1 <= 0) or
+                    (x + width < frame_width and x2 >= width) or (y + height < frame_height and y2 >= height)):
+                return True
+        return False
+
+    def record(self, template: str, hit: bool) -> None:
+        # hit means the match was found clear of the edges of the (unwidened) learned region
+        if self.region(template) is None:
+            return
+        with self._lock:
+            outcomes = self.outcomes.setdefault(template, deque(maxlen=self.window))
+            outcomes.append(hit)
+            if len(outcomes) == self.window and self.miss_rate(template) >= self.relearn_miss_rate:
+                self._stale.add(template)
+
+    def hit_rate(self, template: str) -> float:
+        outcomes = self.outcomes.get(template)
+        return sum(outcomes) / len(outcomes) if outcomes else None
+
+    def miss_rate(self, template: str) -> float:
+        rate = self.hit_rate(template)
+        return None if rate is None else 1.0 - rate
+
+    def needs_relearn(self, template: str) -> bool:
+        return template in self._stale
+
+    def stats(self) -> dict:
+        return {
+            template: {"hit_rate": self.hit_rate(template), "samples": len(outcomes), "stale": template in self._stale}
+            for template, outcomes in self.outcomes.items()
+        }
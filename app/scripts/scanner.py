@@ -0,0 +1,156 @@
+from matching import as_template, find_all_matches_color
+from frame import Frame
+from tracing import Tracer
+import numpy as np
+import cv2
+
+def registration_image(frame, factor: int = 2) -> np.ndarray:
+    if isinstance(frame, Frame):
+        gray = frame.gray
+    else:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    if factor > 1:
+        gray = cv2.resize(gray, (gray.shape[1] // factor, gray.shape[0] // factor), interpolation=cv2.INTER_AREA)
+    return np.float32(gray)
+
+def overlap_error(previous, current, dy: int) -> float:
+    # Mean absolute difference, in gray levels, of the rows both frames show after scrolling dy
+    height = previous.shape[0]
+    if not 0 <= dy < height:
+        return float('inf')
+    return float(np.mean(np.abs(previous[dy:] - current[:height - dy])))
+
+def search_offset(previous, current, max_offset: int) -> int:
+    # Exhaustive fallback for periodic content (rows of identical cards) that aliases phase correlation
+    errors = [overlap_error(previous, current, dy) for dy in range(max_offset)]
+    return int(np.argmin(errors))
+
+def scroll_offset(previous, current, factor: int = 2) -> tuple:
+    """
+    Vertical scroll between two frames: positive when the content moved up
+    (scrolled down). Phase correlation gives the estimate; if the overlapping
+    rows disagree it is re-searched exhaustively on a coarser image.
+    Returns (pixels, error) with error the mean gray-level difference of the
+    overlap at that offset; a large error means the frames could not be
+    registered. Offsets must stay under half the frame height.
+    """
+    a, b = registration_image(previous, factor), registration_image(current, factor)
+    window = cv2.createHanningWindow(a.shape[::-1], cv2.CV_32F)
+    # phaseCorrelate applies the window to its inputs in place
+    (_, shift_y), _ = cv2.phaseCorrelate(a.copy(), b.copy(), window)
+    dy = int(round(-shift_y))
+    error = overlap_error(a, b, dy)
+    if error > 2.0:
+        coarse = 4
+        small_a, small_b = registration_image(a, coarse), registration_image(b, coarse)
+        estimate = search_offset(small_a, small_b, small_a.shape[0] // 2) * coarse
+        # Refine at the registration scale around the coarse estimate
+        candidates = range(max(0, estimate - coarse), min(a.shape[0] // 2, estimate + coarse + 1))
+        dy = min(candidates, key=lambda candidate: overlap_error(a, b, candidate), default=dy)
+        error = overlap_error(a, b, dy)
+    if factor > 1:
+        # Recover the pixels lost to downscaling on every 4th column of the full frames
+        full_a, full_b = registration_image(previous, 1)[:, ::4], registration_image(current, 1)[:, ::4]
+        candidates = range(max(0, dy * factor - factor + 1), dy * factor + factor)
+        dy = min(candidates, key=lambda candidate: overlap_error(full_a, full_b, candidate))
+        return dy, overlap_error(full_a, full_b, dy)
+    return dy, error
+
+class ListingScanner:
+    """
+    Scrolls a results list and yields each listing once, as (x, y, frame) with
+    (x, y) the match center in screen coordinates and frame the Frame it was
+    found in.
+
+    After every scroll the offset is measured by registering the new frame
+    against the previous one, so only the newly exposed strip at the bottom
+    (plus one template height of overlap) is matched. Listings are tracked in
+    page coordinates (screen y plus total scroll), so one seen before a scroll
+    is re-identified by its offset instead of being detected again.
+    """
+    def __init__(self,
+                 template: str,
+                 capture,
+                 scroll,
+                 settle=None,
+                 region: tuple = None,
+                 step: int = -5,
+                 threshold: float = 0.75,
+                 match_mode: str = 'color',
+                 workers: int = None,
+                 max_error: float = 8.0,
+                 max_idle: int = 2
+                 ) -> None:
+        self.template = as_template(template)
+        self.capture = capture
+        self.scroll = scroll
+        self.settle = settle
+        self.region: tuple = region
+        self.step: int = step
+        self.threshold: float = threshold
+        self.match_mode: str = match_mode
+        self.workers: int = workers
+        self.max_error: float = max_error
+        self.max_idle: int = max_idle
+        self.offset: int = 0
+        self.seen: list = []
+        self.matched_rows: int = 0
+
+    def _grab(self) -> Frame:
+        return Frame.wrap(self.capture(self.region))
+
+    def _match(self, frame: Frame, top: int = 0) -> list:
+        # Frame-relative centers of matches in rows [top, height)
+        width, height = frame.size
+        strip = frame.crop((0, top, width, height - top))
+        self.matched_rows += strip.shape[0]
+        with Tracer.span('scan.match', rows=strip.shape[0]):
+            boxes = find_all_matches_color(strip, self.template, self.threshold, mode=self.match_mode, workers=self.workers)
+        return [(int((x1 + x2) // 2), int(top + (y1 + y2) // 2)) for x1, y1, x2, y2 in boxes[:, :4].tolist()]
+
+    def _is_new(self, x: int, page_y: int) -> bool:
+        tolerance_x, tolerance_y = self.template.width / 2, self.template.height / 2
+        for seen_x, seen_y in self.seen:
+            if abs(seen_x - x) <= tolerance_x and abs(seen_y - page_y) <= tolerance_y:
+                return False
+        self.seen.append((x, page_y))
+        return True
+
+    def _emit(self, frame, centers: list):
+        offset_x, offset_y = (self.region[0], self.region[1]) if self.region else (0, 0)
+        # Top to bottom, the order a reader would work through the list
+        for x, y in sorted(centers, key=lambda center: center[1]):
+            if self._is_new(x, y + self.offset):
+                yield x + offset_x, y + offset_y, frame
+
+    def scan(self):
+        if self.template is None:
+            return
+        frame = self._grab()
+        yield from self._emit(frame, self._match(frame))
+
+        idle = 0
+        while idle < self.max_idle:
+            # Re-grab after the consumer acted on the yielded listings
+            previous = self._grab()
+            self.scroll(self.step)
+            if self.settle:
+                self.settle()
+            frame = self._grab()
+
+            with Tracer.span('scan.register'):
+                dy, error = scroll_offset(previous, frame)
+            height = frame.shape[0]
+            if error > self.max_error or not 0 <= dy < height // 2:
+                # Unregistered: match everything and rely on page coordinates being roughly right
+                idle = 0
+                yield from self._emit(frame, self._match(frame))
+                continue
+            if dy == 0:
+                idle += 1
+                continue
+
+            idle = 0
+            self.offset += dy
+            top = max(0, height - dy - self.template.height)
+            yield from self._emit(frame, self._match(frame, top))
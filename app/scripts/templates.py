@@ -0,0 +1,106 @@
+from collections import OrderedDict
+import threading
+import numpy as np
+import cv2
+import os
+
+MATCH_MODES = ('color', 'gray', 'edge')
+
+def edge_map(image) -> np.ndarray:
+    """Sobel gradient magnitude as uint8; the same for light and dark themes of a button."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    gx = cv2.convertScaleAbs(cv2.Sobel(gray, cv2.CV_16S, 1, 0, ksize=3))
+    gy = cv2.convertScaleAbs(cv2.Sobel(gray, cv2.CV_16S, 0, 1, ksize=3))
+    return cv2.addWeighted(gx, 0.5, gy, 0.5, 0)
+
+class Template:
+    """A decoded template image with the derived forms the matchers need."""
+    def __init__(self, path: str, mtime: float, bgr) -> None:
+        self.path: str = path
+        self.mtime: float = mtime
+        self.bgr = bgr
+        self.gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY) if bgr.ndim == 3 else bgr
+        self.height, self.width = bgr.shape[:2]
+        self._edges = None
+        self._scaled: dict = {}
+
+    @property
+    def edges(self) -> np.ndarray:
+        if self._edges is None:
+            self._edges = edge_map(self.gray)
+        return self._edges
+
+    def view(self, mode: str = 'color') -> np.ndarray:
+        # Template pixels in the form a frame_view(frame, mode) is matched against
+        if mode == 'edge':
+            return self.edges
+        if mode == 'gray':
+            return self.gray
+        return self.bgr
+
+    @property
+    def size(self) -> tuple:
+        # Matches PIL's Image.size ordering (width, height)
+        return self.width, self.height
+
+    def scaled(self, scale: float) -> 'Template':
+        # Resized copies are memoized per template for the multi-scale and pyramid searches
+        if scale == 1.0:
+            return self
+        template = self._scaled.get(scale)
+        if template is None:
+            width = max(1, int(round(self.width * scale)))
+            height = max(1, int(round(self.height * scale)))
+            interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+            bgr = cv2.resize(self.bgr, (width, height), interpolation=interpolation)
+            template = Template(self.path, self.mtime, bgr)
+            self._scaled[scale] = template
+        return template
+
+class TemplateRegistry:
+    """Loads each template once and reloads it only when the file's mtime changes."""
+    def __init__(self, max_entries: int = 64) -> None:
+        self.max_entries: int = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Template:
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+
+        with self._lock:
+            template = self._entries.get(path)
+            if template is not None and template.mtime == mtime:
+                self._entries.move_to_end(path)
+                return template
+
+        # Decode outside the lock so other templates stay available
+        bgr = cv2.imread(path, cv2.IMREAD_COLOR)
+        if bgr is None:
+            return None
+        template = Template(path, mtime, bgr)
+
+        with self._lock:
+            self._entries[path] = template
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return template
+
+    def preload(self, paths: list) -> int:
+        return sum(1 for path in paths if self.get(path) is not None)
+
+    def evict(self, path: str = None) -> None:
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,5 +1,8 @@
-from main import analyze
+from main import analyze, match_template, match_changed, Changes
+from matching import Templates
+from frame import Frame
 from optimizer import Log
+import numpy as np
 import time
 
 Log = Log()
@@ -48,14 +51,13 @@ def test(location: bool=False, optimize: bool=False, visualize: bool=False, scan
             # Locate the image and log the coordinates
             coordinates: any = analyze(
                 target_img_path='../images/EasyApply.png',
-                coord_logs_path='../config/coordinate_log.csv',
                 screenshot_path='latest_screenshot.png',
                 optimize_region=None,  # (x, y, width, height)
-                mouse_following=False, # Boolean
                 limit_optimizer=limit_coordinate_fit,    # Integer
                 match_threshold=0.8,   # Integer: (0-1)
-                use_img_scaling=False,  # Set to False to disable scale matching
-                debugger=False
+                scales=(1.0,),         # Template scales to sweep, e.g. (0.75, 1.0, 1.25)
+                pyramid_levels=0,      # Coarse-to-fine search on a 2**n downsampled frame
+                visual_debugger=False
             )
 
             # Calculate the average of the existing coordinates in the CSV
@@ -72,8 +74,39 @@ def test(location: bool=False, optimize: bool=False, visualize: bool=False, scan
 
     print("Tests Complete.")
 
+def incremental_test(template_path: str = '../images/EasyApply.png') -> bool:
+    # Offline check: incremental searches must agree with full ones when a match disappears
+    template = Templates.get(template_path)
+    height, width = template.bgr.shape[:2]
+    rng = np.random.default_rng(0)
+    before = (rng.random((900, 1400, 3)) * 255).astype(np.uint8)
+    for x, y in [(100, 100), (800, 500)]:
+        before[y:y + height, x:x + width] = template.bgr
+    # Remove whichever copy ranks first, so the runner-up has to come from an unchanged block
+    (left, top), _, _, _ = match_template(Frame(before), template, match_threshold=0.8)
+    after = before.copy()
+    after[top:top + height, left:left + width] = (rng.random((height, width, 3)) * 255).astype(np.uint8)
+
+    passed = True
+    for overrides in ({}, {'get_all_matches': True, 'max_results': 1}, {'get_all_matches': True}):
+        opts = {'get_all_matches': False, 'match_threshold': 0.8, 'max_results': None, 'scales': (1.0,),
+                'pyramid_levels': 0, 'match_mode': 'color', 'tile_workers': None, **overrides}
+        stream = ('incremental_test', repr(overrides))
+        for name, image in (('before', before), ('after', after)):
+            frame = Frame(image)
+            incremental = match_changed(frame, template, opts, Changes.update(frame, key=stream), stream)
+            full = match_template(frame, template, opts['get_all_matches'], opts['match_threshold'], opts['max_results'])
+            if opts['get_all_matches']:
+                same = incremental.shape == full.shape and np.allclose(incremental, full)
+            else:
+                same = incremental[:2] == full[:2]
+            print(f"    {overrides or 'single match'} | {name}: {'ok' if same else f'MISMATCH {incremental} != {full}'}")
+            passed = passed and same
+    return passed
+
 # Example of how to call the test function
 if __name__ == "__main__":
+    print(f"Incremental matching check: {'passed' if incremental_test() else 'FAILED'}")
 
     test(location=True,
          optimize=True,
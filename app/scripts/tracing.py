@@ -0,0 +1,167 @@
+from collections import deque
+import threading
+import time
+import json
+import os
+
+class _NullSpan:
+    # Shared no-op context manager returned while tracing is disabled
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'args', 'start')
+
+    def __init__(self, tracer, name: str, args: dict) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, self.start, time.perf_counter_ns() - self.start, self.args)
+        return False
+
+class StageHistogram:
+    """Rolling per-stage durations: log2-bucketed counts plus a window for percentiles."""
+    def __init__(self, window: int = 1024) -> None:
+        self.count: int = 0
+        self.total_ns: int = 0
+        self.max_ns: int = 0
+        self.buckets: dict = {}
+        self.recent: deque = deque(maxlen=window)
+
+    def add(self, duration_ns: int) -> None:
+        self.count += 1
+        self.total_ns += duration_ns
+        self.max_ns = max(self.max_ns, duration_ns)
+        bucket = max(0, duration_ns // 1000).bit_length()  # 2**(bucket-1) <= us < 2**bucket
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.recent.append(duration_ns)
+
+    def percentile(self, p: float) -> float:
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] / 1e6
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": self.total_ns / 1e6,
+            "mean_ms": self.total_ns / self.count / 1e6 if self.count else None,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ns / 1e6,
+            "buckets_us": {f"<{2 ** bucket}": n for bucket, n in sorted(self.buckets.items())},
+        }
+
+class Tracer:
+    """
+    Lightweight span tracing for the capture -> match -> act pipeline.
+
+        with Tracer.span('matchTemplate', template=path):
+            ...
+
+    Disabled tracers hand out a shared no-op span, so instrumentation costs one
+    attribute check. Enable with LOCATOR_TRACE=1 or tracer.enable().
+    """
+    def __init__(self, enabled: bool = False, max_events: int = 100000, window: int = 1024) -> None:
+        self.enabled: bool = enabled
+        self.events: deque = deque(maxlen=max_events)
+        self.histograms: dict = {}
+        self.window: int = window
+        self._lock = threading.Lock()
+        self._origin_ns: int = time.perf_counter_ns()
+        self._pid: int = os.getpid()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def span(self, name: str, **args) -> any:
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def traced(self, name: str = None):
+        """Decorator form of span()."""
+        def decorate(fn):
+            label = name or fn.__qualname__
+            def wrapper(*fn_args, **fn_kwargs):
+                if not self.enabled:
+                    return fn(*fn_args, **fn_kwargs)
+                with _Span(self, label, {}):
+                    return fn(*fn_args, **fn_kwargs)
+            wrapper.__name__ = fn.__name__
+            wrapper.__doc__ = fn.__doc__
+            wrapper.__wrapped__ = fn
+            return wrapper
+        return decorate
+
+    def record(self, name: str, start_ns: int, duration_ns: int, args: dict = None) -> None:
+        with self._lock:
+            self.events.append((name, start_ns, duration_ns, threading.get_ident(), args or None))
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = StageHistogram(self.window)
+            histogram.add(duration_ns)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+
+    def dump(self, path: str = None) -> dict:
+        """Per-stage histograms, printed or written to path as JSON."""
+        stats = self.stats()
+        if path:
+            with open(path, mode='w') as json_file:
+                json.dump(stats, json_file, indent=4)
+        else:
+            for name, summary in stats.items():
+                print(f"    {name:<28} n={summary['count']:<6} mean={summary['mean_ms']:.2f}ms p95={summary['p95_ms']:.2f}ms")
+        return stats
+
+    def export_jsonl(self, path: str) -> int:
+        with self._lock:
+            events = list(self.events)
+        with open(path, mode='w') as file:
+            for name, start_ns, duration_ns, tid, args in events:
+                file.write(json.dumps({
+                    "name": name, "start_ms": (start_ns - self._origin_ns) / 1e6,
+                    "duration_ms": duration_ns / 1e6, "thread": tid, "args": args
+                }) + "\n")
+        return len(events)
+
+    def export_chrome(self, path: str) -> int:
+        """Chrome trace-event format (chrome://tracing, Perfetto)."""
+        with self._lock:
+            events = list(self.events)
+        trace = [{
+            "name": name, "ph": "X", "pid": self._pid, "tid": tid,
+            "ts": (start_ns - self._origin_ns) / 1000.0, "dur": duration_ns / 1000.0,
+            "args": {key: str(value) for key, value in (args or {}).items()}
+        } for name, start_ns, duration_ns, tid, args in events]
+        with open(path, mode='w') as json_file:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, json_file)
+        return len(trace)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.events.clear()
+            self.histograms.clear()
+
+Tracer = Tracer(enabled=os.environ.get('LOCATOR_TRACE', '') not in ('', '0'))
@@ -0,0 +1,135 @@
+from matching import find_all_matches_color, Templates
+from capture import get_backend
+from tracing import Tracer
+import numpy as np
+import time
+import cv2
+
+_capture = None
+
+def default_capture() -> any:
+    global _capture
+    if _capture is None:
+        _capture = get_backend()
+    return _capture
+
+def fingerprint(frame, size: tuple = (32, 32)) -> np.ndarray:
+    """Cheap frame signature: a tiny grayscale thumbnail."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+def difference(a, b) -> float:
+    # Mean absolute difference between two fingerprints, in gray levels
+    if a is None or b is None:
+        return float('inf')
+    return float(np.mean(np.abs(a - b)))
+
+def locate(frame, template: str, threshold: float, region: tuple = None) -> list:
+    matches = find_all_matches_color(frame, template, threshold, max_results=1)
+    if not len(matches):
+        return None
+    x1, y1, x2, y2 = matches[0, :4].astype(int)
+    offset_x, offset_y = (region[0], region[1]) if region else (0, 0)
+    return [int(offset_x + (x1 + x2) // 2), int(offset_y + (y1 + y2) // 2)]
+
+@Tracer.traced('wait_until_stable')
+def wait_until_stable(region: tuple = None,
+                      timeout: float = 10.0,
+                      settle: float = 0.3,
+                      interval: float = 0.05,
+                      tolerance: float = 1.5,
+                      capture = None
+                      ) -> bool:
+    """Returns True once region has not changed by more than tolerance for settle seconds."""
+    capture = capture or default_capture()
+    deadline = time.monotonic() + timeout
+    previous = None
+    stable_since = None
+    while True:
+        current = fingerprint(capture.grab(region))
+        now = time.monotonic()
+        if difference(current, previous) <= tolerance:
+            stable_since = stable_since or now
+            if now - stable_since >= settle:
+                return True
+        else:
+            stable_since = None
+        previous = current
+        if now >= deadline:
+            return False
+        time.sleep(interval)
+
+@Tracer.traced('wait_until_changed')
+def wait_until_changed(reference: np.ndarray,
+                       region: tuple = None,
+                       timeout: float = 10.0,
+                       interval: float = 0.05,
+                       tolerance: float = 1.5,
+                       capture = None
+                       ) -> bool:
+    """
+    Returns True once region's fingerprint differs from reference (a fingerprint
+    taken before an action) by more than tolerance; False on timeout. Waiting for
+    stability alone can return before a slow UI has started to react.
+    """
+    capture = capture or default_capture()
+    deadline = time.monotonic() + timeout
+    while True:
+        if difference(fingerprint(capture.grab(region)), reference) > tolerance:
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+@Tracer.traced('wait_until_visible')
+def wait_until_visible(template: str,
+                       region: tuple = None,
+                       timeout: float = 10.0,
+                       threshold: float = 0.75,
+                       interval: float = 0.05,
+                       tolerance: float = 0.5,
+                       capture = None
+                       ) -> list:
+    """
+    Polls until template appears and returns its center [x, y] in screen
+    coordinates, or None on timeout. Matching only reruns when the frame's
+    fingerprint has changed since the last miss.
+    """
+    capture = capture or default_capture()
+    deadline = time.monotonic() + timeout
+    previous = None
+    while True:
+        frame = capture.grab(region)
+        current = fingerprint(frame)
+        if difference(current, previous) > tolerance:
+            center = locate(frame, Templates.get(template), threshold, region)
+            if center is not None:
+                return center
+            previous = current
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(interval)
+
+@Tracer.traced('wait_until_gone')
+def wait_until_gone(template: str,
+                    region: tuple = None,
+                    timeout: float = 10.0,
+                    threshold: float = 0.75,
+                    interval: float = 0.05,
+                    tolerance: float = 0.5,
+                    capture = None
+                    ) -> bool:
+    """Polls until template is no longer visible; False on timeout."""
+    capture = capture or default_capture()
+    deadline = time.monotonic() + timeout
+    previous = None
+    while True:
+        frame = capture.grab(region)
+        current = fingerprint(frame)
+        if difference(current, previous) > tolerance:
+            if locate(frame, Templates.get(template), threshold, region) is None:
+                return True
+            previous = current
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)